@@ -1,39 +1,57 @@
 # CARE-style counselor practice (Gemini)
 # Run: streamlit run care_gemini.py
 
-import os, re, uuid, csv, json
+import os, re, uuid, json, time
 import streamlit as st
 from datetime import datetime
-import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-from core.llm import gcall
+from core.llm import gcall, gstream
 from core.prompts import (
-    build_patient_system_prompt,
     OVERALL_FEEDBACK_SYSTEM,
     build_history,
 )
 from core.metrics import (
     label_turn_with_llm,
-    compute_session_skill_rates,
+    label_and_feedback_with_llm,
     parse_session_metrics,
+    DEFAULT_KEYS,
 )
 from core.state_utils import (
     effective_mode_from_state,   # <- no-arg
     ensure_mode_consistency,     # <- no-arg
     feedback_enabled,            # <- no-arg
 )
-from core.logs import log_turn, log_session_snapshot
+from core.logs import (
+    log_turn,
+    log_session_snapshot,
+    turn_row,
+    turn_label_columns,
+    session_row,
+    write_row,
+)
+from core.jobs import TURN_JOBS
+from core.openers import OPENERS, opener_prompt
+from core.protocol import (
+    PHASE_ORDER,
+    PHASE_LIMITS,
+    PHASE_SCENARIO,
+    PATIENT_MAX_TOKENS,
+    patient_turn_prompt,
+    metrics_summary_from_labels,
+)
+from core_ui.dataset_qc import load_qc_index
 
 
 # Config
-PHASE_ORDER = ["Pre", "Practice", "Post"]
-PHASE_LIMITS = {"Pre": 6, "Practice": 10, "Post": 6}
 
-PHASE_SCENARIO = {
-    "Pre": "Alex (35, holiday loneliness)",
-    "Practice": "Veteran father (35, reunification barriers)",
-    "Post": "Jane (young adult, low mood & self-esteem, family issues)",
-}
+# "fused": one supervisor call returns labels + micro feedback (Practice)
+# "two_call": label_turn_with_llm, then gen_micro_feedback (kept for comparison)
+SUPERVISOR_MODE = os.getenv("CARE_SUPERVISOR_MODE", "fused")
+
+# "1": Send returns after the patient reply; labels/feedback/logging finish in TURN_JOBS
+BACKGROUND_LABELING = os.getenv("CARE_BACKGROUND_LABELING", "1") != "0"
 
 RISK_PAT = re.compile(
     r"\b(suicide|kill myself|self[- ]harm|end it|overdose|hurt myself)\b", re.I
@@ -54,6 +72,19 @@ Return STRICT JSON with fields:
 Output JSON only.
 """
 
+MICRO_FEEDBACK_FALLBACK = {
+    "strength_title": "Strengths",
+    "strength_note": "Nice listening stance.",
+    "feedback_title": "Feedback",
+    "feedback_note": "Ask a gentle open question.",
+    "alt_response": "",
+}
+
+# Shared by all sessions in this process; worker threads never touch st.session_state.
+TURN_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="care-turn")
+# supervisor calls queue behind patient replies in the core.llm scheduler
+gcall_feedback = partial(gcall, priority="feedback")
+
 
 # Small helpers
 def _clean_json_block(text: str) -> dict:
@@ -90,15 +121,65 @@ JSON:"""
         "alt_response": data.get("alt_response", ""),
     }
 
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, round(time.perf_counter() - t0, 3)
+
+def _label_then_feedback(text: str, want_feedback: bool):
+    """Path A: labeling -> micro feedback (feedback needs the labels)."""
+    timings = {"supervisor_mode": "two_call"}
+    if want_feedback and SUPERVISOR_MODE == "fused":
+        try:
+            (labs, micro), timings["label_feedback_s"] = _timed(label_and_feedback_with_llm, gcall_feedback, text)
+            timings["supervisor_mode"] = "fused"
+            return labs, micro, timings
+        except Exception:
+            # strict parse failed (or call failed) -> old two-call path
+            timings["supervisor_mode"] = "fused->two_call"
+
+    labs, timings["label_s"] = _timed(label_turn_with_llm, gcall_feedback, text)
+    micro = {}
+    if want_feedback:
+        try:
+            micro, timings["micro_feedback_s"] = _timed(gen_micro_feedback, gcall_feedback, text, labs)
+        except Exception:
+            micro = dict(MICRO_FEEDBACK_FALLBACK)
+    return labs, micro, timings
+
+def _label_job(text: str, want_feedback: bool, row: dict):
+    """Background job: label (+ micro feedback) and append the turns.csv row."""
+    labs, micro, timings = _label_then_feedback(text, want_feedback)
+    row.update(turn_label_columns(labs))
+    write_row("turns.csv", row)
+    return labs, micro, timings
+
+def reconcile_label_jobs(wait: bool = False):
+    """Fold finished background jobs back into turn_labels / micro_fb / metrics_summary."""
+    sid = st.session_state["session_id"]
+    if wait:
+        TURN_JOBS.wait(sid, timeout=60)
+    done = TURN_JOBS.collect(sid)
+    if not done:
+        return
+
+    for idx, (result, err) in sorted(done.items()):
+        if idx >= len(st.session_state["turn_labels"]):
+            continue
+        if err is not None:
+            st.warning(f"(labeling skipped for turn {idx + 1}) {err}")
+            labs, micro, timings = {k: 0 for k in DEFAULT_KEYS}, {}, {}
+        else:
+            labs, micro, timings = result
+        st.session_state["turn_labels"][idx] = labs
+        st.session_state["micro_fb"][idx] = micro
+        st.session_state["turn_timings"][idx].update(timings)
+
+    _update_metrics_summary_from_labels()
+    TURN_JOBS.fire_and_forget(write_row, "sessions.csv", session_row(st.session_state))
+
 def _update_metrics_summary_from_labels():
-    rates = compute_session_skill_rates(st.session_state.get("turn_labels", [])) or {}
-    st.session_state["metrics_summary"] = {
-        "Empathy": float(rates.get("empathy_rate", 0.0)),
-        "Reflection": float(rates.get("reflection_rate", 0.0)),
-        "Open Questions": float(rates.get("open_question_rate", 0.0)),
-        "Validation": float(rates.get("validation_rate", 0.0)),
-        "Suggestions": float(rates.get("suggestion_rate", 0.0)),
-    }
+    st.session_state["metrics_summary"] = metrics_summary_from_labels(st.session_state.get("turn_labels", []))
 
 def build_input_hint() -> str:
     phase = st.session_state.get("phase", "Practice")
@@ -112,59 +193,6 @@ def build_input_hint() -> str:
     return "Final assessment: 1–3 short sentences. Show active listening; one open question max; avoid advice."
 
 
-def _normalize_role(role: str) -> str:
-    r = (role or "").strip().lower()
-    if r in {"user", "patient", "client", "seeker"}:
-        return "user"
-    if r in {"assistant", "counselor", "therapist"}:
-        return "assistant"
-    if r == "system":
-        return "system"
-    return "system"  # 안전하게 system으로
-
-def qc_clean_turns(turns: list[dict], remove_consecutive_dupes=True):
-    """
-    returns:
-      cleaned_turns: [{"role": "user|assistant|system", "text": "..."}]
-      qc: {removed_dupes:int, alternation_issues:[...], role_counts:{...}}
-    """
-    cleaned = []
-    removed_dupes = 0
-    prev_key = None
-
-    # 1) normalize + trim + consecutive dedupe
-    for t in (turns or []):
-        role = _normalize_role(t.get("role"))
-        text = (t.get("text") or "").strip()
-        if not text:
-            continue
-        key = (role, text)
-        if remove_consecutive_dupes and prev_key == key:
-            removed_dupes += 1
-            continue
-        prev_key = key
-        cleaned.append({"role": role, "text": text})
-
-    # 2) alternation check (ignoring system)
-    non_system = [t for t in cleaned if t["role"] in {"user", "assistant"}]
-    issues = []
-    for i in range(1, len(non_system)):
-        if non_system[i]["role"] == non_system[i-1]["role"]:
-            issues.append({
-                "idx_in_nonsys": i,
-                "role": non_system[i]["role"],
-                "prev_text": non_system[i-1]["text"][:80],
-                "curr_text": non_system[i]["text"][:80],
-            })
-
-    # counts
-    counts = {"user": 0, "assistant": 0, "system": 0}
-    for t in cleaned:
-        counts[t["role"]] = counts.get(t["role"], 0) + 1
-
-    qc = {"removed_dupes": removed_dupes, "alternation_issues": issues, "role_counts": counts}
-    return cleaned, qc
-
 def render_turn_chat(role: str, text: str, compact_system=True):
     """
     Streamlit chat rendering.
@@ -205,6 +233,7 @@ def setup_session_defaults():
     st.session_state.setdefault("session_metrics", {})
     st.session_state.setdefault("metrics_summary", {})
     st.session_state.setdefault("turn_labels", [])
+    st.session_state.setdefault("turn_timings", [])
     st.session_state.setdefault("_pending_send", False)
     st.session_state.setdefault("reply_box", "")
     st.session_state.setdefault("ds_hide_system", True)
@@ -219,7 +248,8 @@ def setup_session_defaults():
 def reset_run_state():
     for k in [
         "patient_msgs", "counselor_msgs", "overall_feedback", "session_metrics",
-        "metrics_summary", "turn_labels", "_pending_send", "reply_box", "micro_fb"
+        "metrics_summary", "turn_labels", "_pending_send", "reply_box", "micro_fb",
+        "turn_timings",
     ]:
         st.session_state.pop(k, None)
 
@@ -232,6 +262,7 @@ def reset_run_state():
     st.session_state["_pending_send"] = False
     st.session_state["reply_box"] = ""
     st.session_state["micro_fb"] = []
+    st.session_state["turn_timings"] = []
 
 def force_phase_scenario():
     ph = st.session_state["phase"]
@@ -240,6 +271,9 @@ def force_phase_scenario():
         st.session_state["scenario"] = want
 
 def reset_all_and_start():
+    # finish the old session's label jobs (turns.csv rows + final sessions.csv snapshot)
+    # before its id goes away; nothing collects them after that
+    reconcile_label_jobs(wait=True)
     st.session_state["phase"] = "Pre"
     st.session_state["turn_counts"] = {"Pre": 0, "Practice": 0, "Post": 0}
     st.session_state["completed"] = {"Pre": False, "Practice": False, "Post": False}
@@ -252,6 +286,7 @@ def start_next_phase():
     cur = st.session_state["phase"]
     idx = PHASE_ORDER.index(cur)
     if idx < len(PHASE_ORDER) - 1:
+        reconcile_label_jobs(wait=True)
         st.session_state["phase"] = PHASE_ORDER[idx + 1]
         force_phase_scenario()
         reset_run_state()
@@ -324,13 +359,16 @@ def render_dataset_session_chat():
         st.info("Load a random session from the sidebar to preview dataset turns.")
         return
 
-    raw_turns = sess.get("turns", [])
-    turns, qc = qc_clean_turns(raw_turns, remove_consecutive_dupes=st.session_state["ds_dedupe"])
+    # the session is read by byte offset from the dataset's QC index and cleaned here
+    qc_index = load_qc_index(sess["source"])
+    entry = qc_index.entry(sess["index"])
+    turns, qc = qc_index.turns(sess["index"], remove_consecutive_dupes=st.session_state["ds_dedupe"])
+    n_raw = entry["n_raw_turns"]
 
     st.subheader("Dataset session preview")
     st.caption(
-        f"session_id: {sess.get('session_id') or sess.get('sid')}  |  "
-        f"turns: {len(raw_turns)} → {len(turns)}  |  "
+        f"session_id: {entry['session_id']}  |  "
+        f"turns: {n_raw} → {len(turns)}  |  "
         f"removed_dupes: {qc['removed_dupes']}"
     )
 
@@ -358,28 +396,106 @@ def render_dataset_session_chat():
         )
 
 
-def pick_good_random_session(sessions, max_tries=50):
-    for _ in range(max_tries):
-        s = random.choice(sessions)
-        turns, qc = qc_clean_turns(s.get("turns", []), remove_consecutive_dupes=True)
-        if not qc["alternation_issues"] and len(turns) >= 6:
-            return s
-    return random.choice(sessions)  # fallback
+def pick_good_random_session(path):
+    """
+    Random practice-quality session from a dataset file (QC index: no alternation issues,
+    >= MIN_GOOD_TURNS turns). Returns the loaded_ds_session reference, or None for an empty file.
+    """
+    qc_index = load_qc_index(path)
+    i = qc_index.sample()
+    if i is None:
+        return None
+    return {"source": str(path), "index": i, "session_id": qc_index.entry(i)["session_id"]}
+
+
+# LLM – patient replies (streamed)
+def stream_patient_reply(prompt: str, max_tokens: int) -> str:
+    """
+    Render tokens as they arrive, then clear the live slot; the caller stores the final
+    text in patient_msgs and the chat column renders it from there.
+    """
+    slot = st.empty()
+    with slot.container():
+        st.markdown("**Patient:**")
+        text = st.write_stream(gstream(prompt, max_tokens=max_tokens, temperature=0.7, priority="interactive"))
+    slot.empty()
+    if isinstance(text, list):
+        text = "".join(str(x) for x in text)
+    return (text or "").strip()
 
 
 # LLM – first patient message
 def ensure_first_patient():
     if not st.session_state["patient_msgs"]:
-        p = (
-            f"{build_patient_system_prompt(st.session_state['scenario'])}\n"
-            "Task: Start the conversation in 1–2 sentences about how you're feeling."
-        )
-        with st.spinner("Generating the first patient message..."):
-            first, _ = gcall(p, max_tokens=140, temperature=0.7)
+        scenario = st.session_state["scenario"]
+        # pre-generated opener if available (instant), otherwise generate live
+        first = OPENERS.take(scenario)
+        if not first:
+            first = stream_patient_reply(opener_prompt(scenario), max_tokens=140)
         st.session_state["patient_msgs"].append(first)
 
 
 # Send handling
+def _send_concurrent(text: str, nxt_prompt: str, want_feedback: bool):
+    """
+    Both paths run concurrently, Send waits for both:
+      A: label -> micro feedback (Practice only)
+      B: next patient turn (needs only the counselor text)
+    """
+    t0 = time.perf_counter()
+    fut_a = TURN_POOL.submit(_label_then_feedback, text, want_feedback)
+
+    # B streams on the script thread (Streamlit calls) while A runs in the pool
+    patient_s = None
+    try:
+        nxt, patient_s = _timed(stream_patient_reply, nxt_prompt, PATIENT_MAX_TOKENS)
+        st.session_state["patient_msgs"].append(nxt)
+    except Exception as e:
+        st.error(f"Patient generation failed: {e}")
+
+    with st.spinner("Labeling your reply..."):
+        try:
+            labs, micro, timings = fut_a.result()
+        except Exception as e:
+            # same fallback as reconcile_label_jobs; the patient reply is kept
+            st.warning(f"(labeling skipped for this turn) {e}")
+            labs, micro, timings = {k: 0 for k in DEFAULT_KEYS}, {}, {}
+    timings["patient_s"] = patient_s
+    timings["total_s"] = round(time.perf_counter() - t0, 3)
+
+    st.session_state["turn_labels"].append(labs)
+    st.session_state["micro_fb"].append(micro)
+    st.session_state["turn_timings"].append(timings)
+
+    try:
+        log_turn(st, text, labs)
+        _update_metrics_summary_from_labels()
+        log_session_snapshot(st)
+    except Exception as e:
+        st.warning(f"(logging skipped) {e}")
+
+def _send_with_background_labels(text: str, nxt_prompt: str, want_feedback: bool):
+    """
+    Only the patient reply is on the critical path. Labeling, micro feedback and
+    CSV logging are queued in TURN_JOBS; placeholders stay until reconcile_label_jobs().
+    """
+    idx = len(st.session_state["counselor_msgs"]) - 1
+    st.session_state["turn_labels"].append({})
+    st.session_state["micro_fb"].append({"pending": True})
+    st.session_state["turn_timings"].append({})
+    TURN_JOBS.submit(
+        st.session_state["session_id"], idx,
+        _label_job, text, want_feedback, turn_row(st.session_state, text),
+    )
+
+    t0 = time.perf_counter()
+    try:
+        nxt = stream_patient_reply(nxt_prompt, max_tokens=PATIENT_MAX_TOKENS)
+        st.session_state["patient_msgs"].append(nxt)
+    except Exception as e:
+        st.error(f"Patient generation failed: {e}")
+    st.session_state["turn_timings"][idx]["patient_s"] = round(time.perf_counter() - t0, 3)
+
 def handle_pending_send():
     if not st.session_state.get("_pending_send"):
         return
@@ -402,46 +518,13 @@ def handle_pending_send():
     # (1) store counselor turn
     st.session_state["counselor_msgs"].append(text)
 
-    # (2) label/log/aggregate
-    labs = label_turn_with_llm(gcall, text)
-    st.session_state["turn_labels"].append(labs)
+    nxt_prompt = patient_turn_prompt(st.session_state["scenario"], st.session_state["patient_msgs"][-1], text)
+    want_feedback = st.session_state["phase"] == "Practice"
 
-    # micro feedback only in Practice
-    if st.session_state["phase"] == "Practice":
-        try:
-            micro = gen_micro_feedback(gcall, text, labs)
-        except Exception:
-            micro = {
-                "strength_title": "Strengths",
-                "strength_note": "Nice listening stance.",
-                "feedback_title": "Feedback",
-                "feedback_note": "Ask a gentle open question.",
-                "alt_response": "",
-            }
-        st.session_state["micro_fb"].append(micro)
+    if BACKGROUND_LABELING:
+        _send_with_background_labels(text, nxt_prompt, want_feedback)
     else:
-        st.session_state["micro_fb"].append({})
-
-    try:
-        log_turn(st, text, labs)
-        _update_metrics_summary_from_labels()
-        log_session_snapshot(st)
-    except Exception as e:
-        st.warning(f"(logging skipped) {e}")
-
-    # (3) next patient turn
-    nxt_prompt = (
-        f"{build_patient_system_prompt(st.session_state['scenario'])}\n"
-        f"Context: Previous patient message: {st.session_state['patient_msgs'][-1]}\n"
-        f"Counselor replied: {text}\n\n"
-        "Task: Reply as the patient in 1–3 sentences, staying in character."
-    )
-    try:
-        with st.spinner("Patient is responding..."):
-            nxt, _ = gcall(nxt_prompt, max_tokens=200, temperature=0.7)
-        st.session_state["patient_msgs"].append(nxt)
-    except Exception as e:
-        st.error(f"Patient generation failed: {e}")
+        _send_concurrent(text, nxt_prompt, want_feedback)
 
     # (4) increment turn & phase complete check
     st.session_state["turn_counts"][ph] += 1
@@ -469,6 +552,9 @@ def render_chat_column():
         st.markdown(f"**Patient:** {pmsg}")
         if i < len(counselor):
             st.markdown(f"**You:** {counselor[i]}")
+            labels = st.session_state["turn_labels"]
+            if i < len(labels) and not labels[i]:
+                st.caption("⏳ Supervisor labels pending…")
         else:
             st.caption("Write your reply below to complete this turn.")
 
@@ -523,7 +609,7 @@ def render_feedback_column(fb_click):
             "Evaluate the counselor's replies in aggregate."
         )
         with st.spinner("Generating session-level feedback..."):
-            fb_all, _ = gcall(overall_prompt, max_tokens=800, temperature=0.4)
+            fb_all, _ = gcall_feedback(overall_prompt, max_tokens=800, temperature=0.4)
         st.session_state["overall_feedback"] = fb_all
         st.session_state["session_metrics"] = parse_session_metrics(fb_all)
         st.rerun()
@@ -543,6 +629,10 @@ def render_feedback_column(fb_click):
         st.write(f"- Validation: {ms.get('Validation', 0):.2f}")
         st.write(f"- Suggestions: {ms.get('Suggestions', 0):.2f}")
 
+    pending = TURN_JOBS.pending(st.session_state["session_id"])
+    if pending:
+        st.caption(f"⏳ {len(pending)} turn(s) still being labeled; stats update on the next interaction.")
+
 
 # UI – Self-efficacy (Pre/Post)
 def render_self_efficacy_if_needed():
@@ -555,8 +645,6 @@ def render_self_efficacy_if_needed():
         se_act = st.slider("Action", 0, 7, 4, step=1, key=f"se_act_{phase}")
         se_mgmt = st.slider("Session Mgmt", 0, 7, 4, step=1, key=f"se_mgmt_{phase}")
         if st.button(f"Save self-efficacy ({phase})", use_container_width=True, key=f"se_save_{phase}"):
-            os.makedirs("logs", exist_ok=True)
-            path = os.path.join("logs", "seff.csv")
             row = {
                 "ts": datetime.now().isoformat(timespec="seconds"),
                 "participant_id": st.session_state["participant_id"],
@@ -568,12 +656,7 @@ def render_self_efficacy_if_needed():
                 "Action": se_act,
                 "SessionMgmt": se_mgmt,
             }
-            new = not os.path.exists(path)
-            with open(path, "a", newline="", encoding="utf-8") as f:
-                w = csv.DictWriter(f, fieldnames=row.keys())
-                if new:
-                    w.writeheader()
-                w.writerow(row)
+            write_row("seff.csv", row)
             st.success(f"Saved self-efficacy for {phase}.")
 
             if phase == "Pre" and st.session_state["completed"].get("Pre"):
@@ -591,6 +674,7 @@ def main():
 
     setup_session_defaults()
     force_phase_scenario()
+    OPENERS.warm_all(PHASE_SCENARIO.values())  # no-op while pools are above the low-water mark
     render_sidebar()
 
     if not st.session_state["started"]:
@@ -598,6 +682,7 @@ def main():
         return
 
     render_header_badges()
+    reconcile_label_jobs()
     ensure_first_patient()
     handle_pending_send()
 
@@ -0,0 +1,282 @@
+"""
+Inter-rater agreement for session ratings (assess_sessions), per metric and culture.
+
+Ratings are kept sparse: one (unit, rater, category) triplet per latest rating, where a
+unit is a (culture, session_id). Everything else is derived with bincount/matmul:
+  - n_uc: unit x category count matrix -> Krippendorff's alpha (ordinal) and ICC(1)
+  - co-rated pairs (same unit, two raters) -> pairwise quadratic-weighted kappa
+Bootstrap CIs resample units; replicate chunks run in a process pool.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .logs_assess import METRIC_FIELDS
+from .results import SCALE, latest_only
+
+K = len(SCALE)
+MIN_PAIR_OVERLAP = 3  # sessions two raters must share before their kappa counts
+STATS = ["alpha", "icc1", "kappa"]
+
+BOOTSTRAP_WORKERS = int(os.getenv("CARE_AGREEMENT_WORKERS", "0")) or (os.cpu_count() or 1)
+BOOTSTRAP_CHUNK = 200  # replicates per pool task
+
+
+@dataclass
+class RatingData:
+    units: np.ndarray     # unit code per rating
+    raters: np.ndarray    # rater code per rating
+    cats: np.ndarray      # category index 0..K-1 per rating
+    unit_ids: np.ndarray  # unit code -> "culture/session_id"
+    rater_ids: np.ndarray  # rater code -> rater_id
+
+    @property
+    def n_units(self) -> int:
+        return len(self.unit_ids)
+
+
+def rating_data(df: pd.DataFrame, metric: str, *, latest: bool = True) -> RatingData:
+    """df: core.results.ratings_frame output. Keeps the latest rating per (rater, session)."""
+    data = latest_only(df) if latest else df
+    vals = data[metric].to_numpy(dtype="float64")
+    keep = ~np.isnan(vals)
+    data, vals = data[keep], vals[keep]
+    cats = np.clip(np.rint(vals), SCALE[0], SCALE[-1]).astype(np.int64) - SCALE[0]
+    units, unit_ids = pd.factorize(data["culture"] + "/" + data["session_id"], sort=True)
+    raters, rater_ids = pd.factorize(data["rater_id"], sort=True)
+    return RatingData(units, raters, cats, np.asarray(unit_ids), np.asarray(rater_ids))
+
+
+# Sufficient statistics
+def count_matrix(d: RatingData) -> np.ndarray:
+    """n_uc: (n_units, K) counts of each category per unit."""
+    return np.bincount(d.units * K + d.cats, minlength=d.n_units * K).reshape(d.n_units, K).astype("float64")
+
+
+@dataclass
+class PairData:
+    unit: np.ndarray      # unit code per co-rating
+    pair: np.ndarray      # rater-pair code per co-rating
+    cell: np.ndarray      # cat_a * K + cat_b
+    pair_ids: np.ndarray  # (n_pairs, 2) rater codes, a < b
+
+
+def pair_data(d: RatingData) -> PairData:
+    """Every two ratings of the same unit by different raters (one row per unordered pair)."""
+    r = pd.DataFrame({"u": d.units, "r": d.raters, "c": d.cats})
+    m = r.merge(r, on="u", suffixes=("_a", "_b"))
+    m = m[m["r_a"] < m["r_b"]]
+    n_raters = len(d.rater_ids)
+    pair, uniq = pd.factorize((m["r_a"] * n_raters + m["r_b"]).to_numpy(np.int64), sort=True)
+    pair_ids = np.stack([uniq // max(n_raters, 1), uniq % max(n_raters, 1)], axis=1).astype(np.int64)
+    return PairData(
+        unit=m["u"].to_numpy(np.int64),
+        pair=np.asarray(pair, dtype=np.int64),
+        cell=(m["c_a"] * K + m["c_b"]).to_numpy(np.int64),
+        pair_ids=pair_ids,
+    )
+
+
+# Coefficients (w = per-unit bootstrap multiplicity; None = each unit once)
+def krippendorff_alpha_ordinal(n_uc: np.ndarray, w: Optional[np.ndarray] = None) -> float:
+    m_u = n_uc.sum(axis=1)
+    pairable = m_u >= 2
+    if w is not None:
+        pairable &= w > 0
+    n_uc, m_u = n_uc[pairable], m_u[pairable]
+    wu = np.ones(len(m_u)) if w is None else w[pairable]
+    if len(m_u) == 0:
+        return float("nan")
+
+    # coincidence matrix o_ck = sum_u (n_uc n_uk - [c=k] n_uc) / (m_u - 1)
+    scaled = n_uc * (wu / (m_u - 1))[:, None]
+    o = n_uc.T @ scaled - np.diag(scaled.sum(axis=0))
+    n_c = o.sum(axis=1)
+    n = n_c.sum()
+    if n <= 1:
+        return float("nan")
+
+    # ordinal metric: (sum_{g=c..k} n_g - (n_c + n_k)/2)^2
+    cum = np.concatenate([[0.0], np.cumsum(n_c)])
+    c, k = np.meshgrid(np.arange(K), np.arange(K), indexing="ij")
+    lo, hi = np.minimum(c, k), np.maximum(c, k)
+    delta2 = (cum[hi + 1] - cum[lo] - (n_c[c] + n_c[k]) / 2.0) ** 2
+
+    d_o = (o * delta2).sum()
+    d_e = (np.outer(n_c, n_c) * delta2).sum()
+    if d_e == 0:
+        return float("nan")
+    return float(1.0 - (n - 1) * d_o / d_e)
+
+
+def icc1(n_uc: np.ndarray, w: Optional[np.ndarray] = None) -> float:
+    """One-way random-effects ICC(1) for unbalanced designs (k0-adjusted)."""
+    m_u = n_uc.sum(axis=1)
+    keep = m_u >= 2
+    if w is not None:
+        keep &= w > 0
+    n_uc, m_u = n_uc[keep], m_u[keep]
+    wu = np.ones(len(m_u)) if w is None else w[keep]
+    n_groups = wu.sum()
+    if n_groups < 2:
+        return float("nan")
+
+    s1 = n_uc @ SCALE.astype("float64")
+    s2 = n_uc @ (SCALE.astype("float64") ** 2)
+    n_total = (wu * m_u).sum()
+    grand = (wu * s1).sum() / n_total
+    ss_between = (wu * (s1 ** 2 / m_u)).sum() - n_total * grand ** 2
+    ss_within = (wu * (s2 - s1 ** 2 / m_u)).sum()
+    df_b, df_w = n_groups - 1, n_total - n_groups
+    if df_w <= 0:
+        return float("nan")
+    msb, msw = ss_between / df_b, ss_within / df_w
+    k0 = (n_total - (wu * m_u ** 2).sum() / n_total) / df_b
+    denom = msb + (k0 - 1) * msw
+    if denom == 0:
+        return float("nan")
+    return float((msb - msw) / denom)
+
+
+_QW = ((np.arange(K)[:, None] - np.arange(K)[None, :]) ** 2) / float((K - 1) ** 2)
+
+
+def pairwise_kappa(p: PairData, w: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Quadratic-weighted kappa per rater pair -> (kappa, n_shared)."""
+    n_pairs = len(p.pair_ids)
+    weights = None if w is None else w[p.unit]
+    conf = np.bincount(p.pair * K * K + p.cell, weights=weights, minlength=n_pairs * K * K)
+    conf = conf.reshape(n_pairs, K, K)
+    n = conf.sum(axis=(1, 2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = conf.sum(axis=2)[:, :, None] * conf.sum(axis=1)[:, None, :] / n[:, None, None]
+        d_o = (conf * _QW).sum(axis=(1, 2))
+        d_e = (expected * _QW).sum(axis=(1, 2))
+        kappa = 1.0 - d_o / d_e
+    kappa[(n == 0) | (d_e == 0)] = np.nan
+    return kappa, n
+
+
+def eligible_pairs(p: PairData) -> np.ndarray:
+    """Pairs sharing at least MIN_PAIR_OVERLAP sessions in the observed data."""
+    _, n = pairwise_kappa(p)
+    return n >= MIN_PAIR_OVERLAP
+
+
+def mean_kappa(p: PairData, w: Optional[np.ndarray] = None,
+               eligible: Optional[np.ndarray] = None) -> float:
+    """Mean kappa over `eligible` pairs (fixed from the full data so bootstrap replicates compare like with like)."""
+    kappa, _ = pairwise_kappa(p, w)
+    ok = (eligible_pairs(p) if eligible is None else eligible) & ~np.isnan(kappa)
+    return float(kappa[ok].mean()) if ok.any() else float("nan")
+
+
+def _coefficients(n_uc: np.ndarray, p: PairData, w: Optional[np.ndarray] = None,
+                  eligible: Optional[np.ndarray] = None) -> np.ndarray:
+    return np.array([krippendorff_alpha_ordinal(n_uc, w), icc1(n_uc, w), mean_kappa(p, w, eligible)])
+
+
+# Bootstrap
+def _bootstrap_chunk(n_uc: np.ndarray, p: PairData, n_rep: int, seed: int) -> np.ndarray:
+    """Top-level so it pickles into pool workers. Resamples units with replacement."""
+    rng = np.random.default_rng(seed)
+    n_units = len(n_uc)
+    eligible = eligible_pairs(p)
+    out = np.empty((n_rep, len(STATS)))
+    for i in range(n_rep):
+        w = np.bincount(rng.integers(0, n_units, n_units), minlength=n_units).astype("float64")
+        out[i] = _coefficients(n_uc, p, w, eligible)
+    return out
+
+
+def _percentile_ci(reps: np.ndarray, level: float = 0.95) -> np.ndarray:
+    lo, hi = (1 - level) / 2 * 100, (1 + level) / 2 * 100
+    with np.errstate(invalid="ignore"):
+        return np.nanpercentile(reps, [lo, hi], axis=0) if len(reps) else np.full((2, len(STATS)), np.nan)
+
+
+# Summary tables
+def _groups(df: pd.DataFrame, by_culture: bool) -> List[Tuple[str, pd.DataFrame]]:
+    if not by_culture:
+        return [("(all)", df)]
+    return [(c, g) for c, g in df.groupby("culture", sort=True)]
+
+
+def agreement_summary(df: pd.DataFrame, *, metrics: Iterable[str] = METRIC_FIELDS,
+                      by_culture: bool = True, n_boot: int = 0, seed: int = 0,
+                      workers: int = BOOTSTRAP_WORKERS) -> pd.DataFrame:
+    """
+    One row per (culture, metric): alpha (ordinal), icc1, mean pairwise kappa, plus
+    95% percentile bootstrap CIs when n_boot > 0.
+    df: core.results.ratings_frame output (all raters).
+    """
+    tasks = []
+    rows: List[Dict] = []
+    for culture, grp in _groups(df, by_culture):
+        for metric in metrics:
+            d = rating_data(grp, metric)
+            n_uc = count_matrix(d)
+            p = pair_data(d)
+            eligible = eligible_pairs(p)
+            est = _coefficients(n_uc, p, eligible=eligible)
+            rows.append({
+                "culture": culture,
+                "metric": metric,
+                "raters": len(d.rater_ids),
+                "sessions": int((n_uc.sum(axis=1) >= 2).sum()),  # rated by 2+ raters
+                "ratings": len(d.cats),
+                "rater_pairs": int(eligible.sum()),
+                **dict(zip(STATS, est)),
+            })
+            tasks.append((n_uc, p))
+
+    out = pd.DataFrame(rows, columns=["culture", "metric", "raters", "sessions", "ratings", "rater_pairs", *STATS])
+    if n_boot > 0 and rows:
+        reps = bootstrap(tasks, n_boot=n_boot, seed=seed, workers=workers)
+        cis = np.stack([_percentile_ci(r) for r in reps])  # (tasks, 2, stats)
+        for j, s in enumerate(STATS):
+            out[f"{s}_ci_low"] = cis[:, 0, j]
+            out[f"{s}_ci_high"] = cis[:, 1, j]
+    return out
+
+
+def bootstrap(tasks: List[Tuple[np.ndarray, PairData]], *, n_boot: int, seed: int = 0,
+              workers: int = BOOTSTRAP_WORKERS) -> List[np.ndarray]:
+    """Replicates (n_boot, len(STATS)) per task; chunks fan out over a process pool."""
+    plan = []  # (task index, replicates, seed)
+    for t in range(len(tasks)):
+        for c, start in enumerate(range(0, n_boot, BOOTSTRAP_CHUNK)):
+            plan.append((t, min(BOOTSTRAP_CHUNK, n_boot - start), seed * 1_000_003 + t * 9_973 + c))
+
+    results: Dict[int, List[np.ndarray]] = {t: [] for t in range(len(tasks))}
+    if workers <= 1 or len(plan) == 1:
+        for t, n_rep, s in plan:
+            results[t].append(_bootstrap_chunk(*tasks[t], n_rep, s))
+    else:
+        # spawn: the Streamlit server process is multi-threaded, fork is unsafe there
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(plan)), mp_context=ctx) as pool:
+            futs = [(t, pool.submit(_bootstrap_chunk, *tasks[t], n_rep, s)) for t, n_rep, s in plan]
+            for t, fut in futs:  # plan order -> deterministic for a given seed
+                results[t].append(fut.result())
+    return [np.concatenate(results[t]) if results[t] else np.empty((0, len(STATS))) for t in range(len(tasks))]
+
+
+def pairwise_kappa_table(df: pd.DataFrame, metric: str) -> pd.DataFrame:
+    """Per rater pair: shared sessions and quadratic-weighted kappa for one metric."""
+    d = rating_data(df, metric)
+    p = pair_data(d)
+    kappa, n = pairwise_kappa(p)
+    return pd.DataFrame({
+        "rater_a": d.rater_ids[p.pair_ids[:, 0]] if len(p.pair_ids) else [],
+        "rater_b": d.rater_ids[p.pair_ids[:, 1]] if len(p.pair_ids) else [],
+        "shared_sessions": n.astype(int),
+        "kappa": kappa,
+    }).sort_values(["shared_sessions", "rater_a", "rater_b"], ascending=[False, True, True], ignore_index=True)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import atexit
+import csv
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, O_APPEND writes only
+    fcntl = None
+
+
+# fsync policy for every flushed batch:
+#   "always": fsync after each write (durable, slowest)
+#   "never":  leave it to the OS (default)
+FSYNC_POLICY = os.getenv("CARE_LOG_FSYNC", "never")
+# rows kept in memory before a flush (0 = write through); buffered logs also flush every interval
+BUFFER_ROWS = int(os.getenv("CARE_LOG_BUFFER_ROWS", "0"))
+FLUSH_INTERVAL_S = float(os.getenv("CARE_LOG_FLUSH_INTERVAL_S", "2.0"))
+
+
+class AppendLog:
+    """
+    Concurrency-safe CSV append log shared by all writers in a process.
+
+    Each flush opens the file with O_APPEND, takes an exclusive fcntl lock, writes the
+    header only if the file is empty (checked under the lock, so workers never race on
+    it) and writes the whole batch with one os.write call.
+    """
+
+    def __init__(self, path: Path, fieldnames: Optional[Sequence[str]] = None,
+                 buffer_rows: int = 0, flush_interval_s: float = FLUSH_INTERVAL_S,
+                 fsync: str = FSYNC_POLICY):
+        self.path = Path(path)
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.buffer_rows = max(0, int(buffer_rows))
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self._buf: List[Dict] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    # Encoding
+    def _encode(self, rows: List[Dict], with_header: bool) -> bytes:
+        out = io.StringIO()
+        w = csv.DictWriter(out, fieldnames=self.fieldnames, extrasaction="ignore")
+        if with_header:
+            w.writeheader()
+        w.writerows(rows)
+        return out.getvalue().encode("utf-8")
+
+    def _write(self, rows: List[Dict], header_only: bool = False):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            empty = os.fstat(fd).st_size == 0
+            if header_only and not empty:
+                return
+            data = self._encode(rows, with_header=empty)
+            view = memoryview(data)
+            while view:
+                n = os.write(fd, view)
+                view = view[n:]
+            if self.fsync == "always":
+                os.fsync(fd)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    # Public API
+    def ensure_header(self):
+        if self.fieldnames is None:
+            raise ValueError("fieldnames required to write a header")
+        with self._lock:
+            self._write([], header_only=True)
+
+    def append(self, row: Dict):
+        with self._lock:
+            if self.fieldnames is None:
+                self.fieldnames = list(row.keys())
+            if self.buffer_rows == 0:
+                self._write([row])
+                return
+            self._buf.append(row)
+            if len(self._buf) >= self.buffer_rows:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buf:
+            rows, self._buf = self._buf, []
+            self._write(rows)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+_LOGS: Dict[str, AppendLog] = {}
+_LOGS_LOCK = threading.Lock()
+
+
+def get_log(path: Path, fieldnames: Optional[Sequence[str]] = None,
+            buffer_rows: int = BUFFER_ROWS) -> AppendLog:
+    """Process-wide AppendLog per path (the first caller's settings win)."""
+    key = str(Path(path).resolve())
+    with _LOGS_LOCK:
+        log = _LOGS.get(key)
+        if log is None:
+            log = AppendLog(path, fieldnames=fieldnames, buffer_rows=buffer_rows)
+            _LOGS[key] = log
+        return log
+
+
+def append_row(path: Path, row: Dict, fieldnames: Optional[Sequence[str]] = None):
+    get_log(path, fieldnames).append(row)
+
+
+@atexit.register
+def flush_all():
+    for log in list(_LOGS.values()):
+        try:
+            log.flush()
+        except OSError:
+            pass
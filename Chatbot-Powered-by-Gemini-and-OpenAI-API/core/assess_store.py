@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import csv
+import io
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+
+# stored stripped so lookups can use the indexes without TRIM()
+KEY_FIELDS = {"rater_id", "culture", "session_id", "timestamp_utc"}
+
+
+def csv_signature(st) -> str:
+    """(inode, mtime_ns, size) of the CSV: a change other than growth means it was replaced."""
+    return f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def complete_records(blob: bytes) -> Tuple[List[List[str]], int]:
+    """
+    CSV records in blob up to the last complete one -> (records, bytes consumed).
+    A record ends at a newline outside quotes (even number of '"' so far), so a row still
+    being written - even one whose quoted comment contains newlines - is left for later.
+    """
+    cut = pos = quotes = 0
+    while True:
+        nl = blob.find(b"\n", pos)
+        if nl == -1:
+            break
+        quotes += blob.count(b'"', pos, nl)
+        pos = nl + 1
+        if quotes % 2 == 0:
+            cut = pos
+    text = blob[:cut].decode("utf-8")
+    return [rec for rec in csv.reader(io.StringIO(text, newline="")) if rec], cut
+
+
+class AssessStore:
+    """
+    Indexed SQLite (WAL) mirror of assess_sessions.csv.
+
+    The CSV stays the append-only source of truth; the store imports whatever was
+    appended since its last sync (tracked as a byte offset), so rows written by other
+    processes show up too. A CSV replaced in place (new inode, or new mtime at the same
+    size) is re-imported from scratch. Queries then hit indexes instead of rescanning the CSV:
+      (rater_id, culture, session_id, timestamp_utc) and (rater_id, timestamp_utc).
+    """
+
+    def __init__(self, db_path: Path, csv_path: Path, fields: Sequence[str]):
+        self.db_path = Path(db_path)
+        self.csv_path = Path(csv_path)
+        self.fields = list(fields)
+        self._local = threading.local()
+
+    # Connection / schema
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            cols = ", ".join(f'"{f}" TEXT' for f in self.fields)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS assessments (id INTEGER PRIMARY KEY, {cols})")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_assess_rcst"
+                " ON assessments(rater_id, culture, session_id, timestamp_utc)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_assess_rt ON assessments(rater_id, timestamp_utc)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, conn, key: str, default: str = "") -> str:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, conn, key: str, value: str):
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, str(value)))
+
+    # CSV import
+    def sync(self) -> int:
+        """Import rows appended to the CSV since the last sync. Returns #rows imported."""
+        if not self.csv_path.exists():
+            return 0
+        st = self.csv_path.stat()
+        size, sig = st.st_size, csv_signature(st)
+        conn = self._conn()
+        if self._meta(conn, "csv_sig") == sig:
+            return 0  # fast path: file untouched since the last sync
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            offset = int(self._meta(conn, "csv_offset", "0") or 0)
+            ino, mtime_ns, old_size = (self._meta(conn, "csv_sig") or "::").split(":")
+            replaced = (
+                ino != str(st.st_ino)
+                or size < offset
+                or (str(size) == old_size and mtime_ns != str(st.st_mtime_ns))
+            )
+            if replaced:
+                # CSV was truncated/replaced -> re-import from scratch
+                conn.execute("DELETE FROM assessments")
+                offset = 0
+
+            with open(self.csv_path, "rb") as f:
+                header_line = f.readline()
+                header = next(csv.reader([header_line.decode("utf-8-sig")]), [])
+                start = max(offset, len(header_line))
+                f.seek(start)
+                blob = f.read(size - start)
+            # only complete records; a row being written right now is picked up next time
+            records, cut = complete_records(blob)
+
+            rows = []
+            for rec in records:
+                d = dict(zip(header, rec))
+                rows.append(tuple(
+                    (d.get(k) or "").strip() if k in KEY_FIELDS else d.get(k, "")
+                    for k in self.fields
+                ))
+            if rows:
+                cols = ", ".join(f'"{f}"' for f in self.fields)
+                marks = ", ".join("?" for _ in self.fields)
+                conn.executemany(f"INSERT INTO assessments ({cols}) VALUES ({marks})", rows)
+            self._set_meta(conn, "csv_offset", start + cut)
+            self._set_meta(conn, "csv_sig", sig)
+            conn.execute("COMMIT")
+            return len(rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def rebuild(self) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM assessments")
+        self._set_meta(conn, "csv_offset", 0)
+        self._set_meta(conn, "csv_sig", "")
+        conn.execute("COMMIT")
+        return self.sync()
+
+    # Queries
+    def _where(self, rater_id: Optional[str], culture: Optional[str]):
+        clauses, args = [], []
+        if rater_id is not None:
+            clauses.append("rater_id = ?")
+            args.append((rater_id or "").strip())
+        if culture is not None:
+            clauses.append("culture = ?")
+            args.append((culture or "").strip())
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def rows(self, *, rater_id: Optional[str] = None, culture: Optional[str] = None) -> List[Dict]:
+        self.sync()
+        where, args = self._where(rater_id, culture)
+        cur = self._conn().execute(f"SELECT * FROM assessments{where} ORDER BY id", args)
+        return [{k: r[k] for k in self.fields} for r in cur]
+
+    def rated_session_ids(self, *, rater_id: str, culture: str) -> Set[str]:
+        self.sync()
+        where, args = self._where(rater_id, culture)
+        cur = self._conn().execute(
+            f"SELECT DISTINCT session_id FROM assessments{where} AND session_id != ''", args
+        )
+        return {r[0] for r in cur}
+
+    def latest_rows(self, *, rater_id: str, culture: str) -> Dict[str, Dict]:
+        """Latest row per session_id by timestamp_utc (first-appended wins ties)."""
+        self.sync()
+        where, args = self._where(rater_id, culture)
+        cur = self._conn().execute(
+            "SELECT * FROM ("
+            "  SELECT *, ROW_NUMBER() OVER ("
+            "    PARTITION BY session_id ORDER BY timestamp_utc DESC, id ASC) AS rn"
+            f"  FROM assessments{where} AND session_id != ''"
+            ") WHERE rn = 1",
+            args,
+        )
+        return {r["session_id"]: {k: r[k] for k in self.fields} for r in cur}
+
+    def last_culture(self, *, rater_id: str) -> Optional[str]:
+        self.sync()
+        row = self._conn().execute(
+            "SELECT culture FROM assessments WHERE rater_id = ? AND timestamp_utc != ''"
+            " ORDER BY timestamp_utc DESC, id ASC LIMIT 1",
+            ((rater_id or "").strip(),),
+        ).fetchone()
+        culture = (row[0] or "").strip() if row else ""
+        return culture or None
+
+    # CSV export
+    def export_csv(self, out_path: Path, *, rater_id: Optional[str] = None,
+                   culture: Optional[str] = None) -> int:
+        rows = self.rows(rater_id=rater_id, culture=culture)
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=self.fields)
+            w.writeheader()
+            w.writerows(rows)
+        return len(rows)
@@ -0,0 +1,244 @@
+"""
+Columnar (Parquet) compaction of the append-only CSV logs + a reader that merges
+compacted Parquet with the still-uncompacted CSV tail.
+
+Layout (under logs/parquet/):
+  manifest.json
+  turns/date=2026-01-05/phase=Practice/part-000000000000-000000004096.parquet
+  assess_sessions/date=2026-01-05/culture=Hispanic/part-....parquet
+
+The CSVs are never rewritten (the live writers and tail readers keep appending to
+and reading from them); the manifest stores, per table, the CSV byte offset up to
+which rows have been compacted. Readers take Parquet for [0, offset) and parse the
+CSV only from offset onwards.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .logs_assess import ASSESS_CSV, LOG_DIR, METRIC_FIELDS
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+PARQUET_DIR = LOG_DIR / "parquet"
+MANIFEST = PARQUET_DIR / "manifest.json"
+
+# core.logs writes relative to the working directory ("logs/..."); assess logs live in LOG_DIR
+LOG_SOURCES: Dict[str, Path] = {
+    "turns": Path("logs") / "turns.csv",
+    "sessions": Path("logs") / "sessions.csv",
+    "seff": Path("logs") / "seff.csv",
+    "assess_sessions": ASSESS_CSV,
+}
+
+TS_COLUMN = {"turns": "ts", "sessions": "ts", "seff": "ts", "assess_sessions": "timestamp_utc"}
+
+PARTITION_BY = {
+    "turns": ["date", "phase"],
+    "sessions": ["date", "phase"],
+    "seff": ["date", "phase"],
+    "assess_sessions": ["date", "culture"],
+}
+
+NUMERIC_COLUMNS = {
+    "turns": ["turn_idx", "empathy", "reflection", "validation", "open_question", "suggestion"],
+    "sessions": ["turns", "Empathy", "Reflection", "Open Questions", "Validation", "Suggestions",
+                 "GAP_words", "T_GAP", "CounselorWords"],
+    "seff": ["Exploration", "Action", "SessionMgmt"],
+    "assess_sessions": ["session_idx", *METRIC_FIELDS],
+}
+
+SEQ_COL = "_seq"  # global append order, kept so reads can restore CSV order
+
+_lock = threading.Lock()
+
+
+# Manifest
+def load_manifest() -> Dict:
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"version": 1, "tables": {}}
+
+
+def _save_manifest(manifest: Dict):
+    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST.with_name(MANIFEST.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(MANIFEST)
+
+
+class _CompactionLock:
+    """Cross-process lock so two workers never compact the same offsets."""
+
+    def __enter__(self):
+        PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+        _lock.acquire()
+        self._f = open(PARQUET_DIR / ".lock", "w")
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+        _lock.release()
+
+
+# CSV tail parsing
+def _read_header(path: Path) -> Tuple[List[str], int]:
+    with open(path, "rb") as f:
+        line = f.readline()
+    return next(csv.reader([line.decode("utf-8-sig")]), []), len(line)
+
+
+def _read_csv_slice(path: Path, header: List[str], start: int,
+                    columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, int]:
+    """Complete rows from byte `start` to EOF -> (DataFrame of strings, end offset)."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        blob = f.read()
+    cut = blob.rfind(b"\n") + 1
+    text = blob[:cut].decode("utf-8")
+    if not text.strip():
+        return pd.DataFrame(columns=columns or header), start + cut
+    usecols = [c for c in (columns or header) if c in header]
+    df = pd.read_csv(
+        io.StringIO(text), names=header, header=None, usecols=usecols,
+        dtype=str, keep_default_na=False,
+    )
+    return df, start + cut
+
+
+def _typed(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    for col in NUMERIC_COLUMNS.get(table, []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+
+def _with_partitions(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    ts = df.get(TS_COLUMN[table], pd.Series("", index=df.index)).astype(str)
+    df["date"] = ts.str.slice(0, 10).where(ts.str.len() >= 10, "unknown")
+    return df
+
+
+def _safe_part(v) -> str:
+    v = str(v).strip() or "unknown"
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", v)
+
+
+# Compaction
+def compact_table(table: str) -> Dict:
+    """Roll the uncompacted CSV tail of `table` into partitioned Parquet files."""
+    src = Path(LOG_SOURCES[table])
+    if not src.exists() or src.stat().st_size == 0:
+        return {"table": table, "rows": 0}
+
+    with _CompactionLock():
+        manifest = load_manifest()
+        entry = manifest["tables"].setdefault(table, {"csv_offset": 0, "rows": 0, "files": []})
+        header, header_len = _read_header(src)
+        if entry.get("header") and entry["header"] != header:
+            raise ValueError(f"{src} header changed since last compaction; re-run with a fresh manifest")
+        if src.stat().st_size < entry["csv_offset"]:
+            raise ValueError(f"{src} is shorter than the compacted offset (truncated/replaced?)")
+
+        start = max(entry["csv_offset"], header_len)
+        df, end = _read_csv_slice(src, header, start)
+        if df.empty:
+            entry["csv_offset"] = end
+            entry["header"] = header
+            _save_manifest(manifest)
+            return {"table": table, "rows": 0}
+
+        df = _typed(table, _with_partitions(table, df))
+        df[SEQ_COL] = range(entry["rows"], entry["rows"] + len(df))
+        parts = PARTITION_BY[table]
+        for p in parts:
+            if p not in df.columns:
+                df[p] = "unknown"
+
+        written = []
+        for key, part in df.groupby(parts, sort=True, dropna=False):
+            key = key if isinstance(key, tuple) else (key,)
+            partition = {p: str(v) for p, v in zip(parts, key)}
+            rel = Path(table).joinpath(*(f"{p}={_safe_part(v)}" for p, v in partition.items()))
+            out = PARQUET_DIR / rel / f"part-{start:012d}-{end:012d}.parquet"
+            out.parent.mkdir(parents=True, exist_ok=True)
+            part.drop(columns=[p for p in parts if p not in header]).to_parquet(out, index=False)
+            written.append({
+                "path": str(out.relative_to(PARQUET_DIR)),
+                "partition": partition,
+                "rows": int(len(part)),
+            })
+
+        entry["files"].extend(written)
+        entry["rows"] += int(len(df))
+        entry["csv_offset"] = end
+        entry["header"] = header
+        _save_manifest(manifest)
+        return {"table": table, "rows": int(len(df)), "files": len(written)}
+
+
+def compact_all(tables: Iterable[str] = LOG_SOURCES) -> List[Dict]:
+    return [compact_table(t) for t in tables]
+
+
+# Reader
+def read_log_table(table: str, columns: Optional[List[str]] = None,
+                   filters: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+    """
+    Compacted Parquet + uncompacted CSV tail as one DataFrame (append order).
+    columns: only these columns are read from Parquet/CSV
+    filters: equality filters; partition keys (date/phase/culture) also prune files
+    """
+    filters = filters or {}
+    src = Path(LOG_SOURCES[table])
+    entry = load_manifest()["tables"].get(table, {"csv_offset": 0, "files": []})
+    want = None if columns is None else list(dict.fromkeys([*columns, *filters]))
+
+    frames = []
+    for f in entry.get("files", []):
+        part = f.get("partition", {})
+        if any(k in part and part[k] != str(v) for k, v in filters.items()):
+            continue
+        cols = None if want is None else [c for c in want if c not in part] + [SEQ_COL]
+        df = pd.read_parquet(PARQUET_DIR / f["path"], columns=cols)
+        for k, v in part.items():
+            if want is None or k in want:
+                df[k] = v
+        frames.append(df)
+
+    if src.exists() and src.stat().st_size > 0:
+        header, header_len = _read_header(src)
+        start = max(entry.get("csv_offset", 0), header_len)
+        tail, _ = _read_csv_slice(src, header, start)  # small by construction: read all columns
+        if not tail.empty:
+            tail = _with_partitions(table, _typed(table, tail))
+            tail[SEQ_COL] = range(entry.get("rows", 0), entry.get("rows", 0) + len(tail))
+            frames.append(tail)
+
+    if not frames:
+        return pd.DataFrame(columns=want or [])
+    df = pd.concat(frames, ignore_index=True)
+    for k, v in filters.items():
+        if k in df.columns:
+            df = df[df[k].astype(str) == str(v)]
+    df = df.sort_values(SEQ_COL, kind="stable").drop(columns=[SEQ_COL]).reset_index(drop=True)
+    if want is not None:
+        df = df[[c for c in want if c in df.columns]]
+    return df
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class TurnJobQueue:
+    """
+    Per-process background queue for work that should not block the Send button
+    (turn labeling, micro feedback, CSV logging).
+
+    Jobs are keyed by (session_id, turn_idx). Workers must not touch st.session_state;
+    the Streamlit script thread collects finished results on a later rerun and
+    reconciles its own state.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="care-jobs")
+        self._jobs: Dict[Tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id: str, turn_idx: int, fn: Callable, *args, **kwargs) -> Future:
+        fut = self._pool.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._jobs[(session_id, turn_idx)] = fut
+        return fut
+
+    def fire_and_forget(self, fn: Callable, *args, **kwargs) -> Future:
+        """Untracked job (e.g. a session snapshot write)."""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def pending(self, session_id: str) -> List[int]:
+        with self._lock:
+            return sorted(i for (sid, i), f in self._jobs.items() if sid == session_id and not f.done())
+
+    def collect(self, session_id: str) -> Dict[int, Tuple[Any, BaseException | None]]:
+        """Pop finished jobs for session_id -> {turn_idx: (result, error)}."""
+        out = {}
+        with self._lock:
+            done = [(k, f) for k, f in self._jobs.items() if k[0] == session_id and f.done()]
+            for k, _ in done:
+                del self._jobs[k]
+        for (_, idx), fut in done:
+            err = fut.exception()
+            out[idx] = (None if err else fut.result(), err)
+        return out
+
+    def wait(self, session_id: str, timeout: float | None = None):
+        with self._lock:
+            futs = [f for (sid, _), f in self._jobs.items() if sid == session_id]
+        if futs:
+            wait(futs, timeout=timeout)
+
+
+# shared by every Streamlit session in this process
+TURN_JOBS = TurnJobQueue()
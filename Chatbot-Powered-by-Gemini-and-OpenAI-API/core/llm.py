@@ -1,44 +1,437 @@
 import os
+import queue
+import threading
+import time
+from functools import partial
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from .llm_breaker import BREAKERS, RETRY_BUDGET, CircuitOpen
+from .llm_cache import CACHE_ENABLED, RESPONSE_CACHE, make_key
+from .llm_router import HEDGE_POOLS, MAX_INFLIGHT, ROUTER, ROUTING_MODE, TTFT_ROUTER, hedged, route
+from .llm_scheduler import SCHEDULER, LLMBusy, current_priority, scheduler_stats
+
+# Process-wide client state (shared by every Streamlit session in this worker)
+MODEL_PLAN_TTL_S = float(os.getenv("GEMINI_MODEL_PLAN_TTL_S", "900"))
+MODEL_PLAN_RETRY_S = 30.0  # failed discovery -> retry sooner than the full TTL
+
+_lock = threading.Lock()
+_configured = False
+_plan = None            # cached result of pick_models()
+_plan_ts = 0.0          # time.monotonic() when _plan was discovered
+_refreshing = False
+_models = {}            # model name -> genai.GenerativeModel
+
+
 def ensure_genai():
-    load_dotenv()
-    api = os.getenv("GOOGLE_API_KEY")
-    if not api:
-        raise RuntimeError("GOOGLE_API_KEY not found in .env")
-    genai.configure(api_key=api)
+    """Configure the SDK once per process (re-reading .env only on the first call)."""
+    global _configured
+    if _configured:
+        return
+    with _lock:
+        if _configured:
+            return
+        load_dotenv()
+        api = os.getenv("GOOGLE_API_KEY")
+        if not api:
+            raise RuntimeError("GOOGLE_API_KEY not found in .env")
+        genai.configure(api_key=api)
+        _configured = True
+
 
-def pick_models():
+def _discover_models():
+    """Returns (plan, ok). ok=False means list_models() failed and the fallback was used."""
     try:
         avail = [m.name for m in genai.list_models()
             if "generateContent" in getattr(m, "supported_generation_methods", [])]
         preferred = ["gemini-2.5-flash-preview-09-2025", "gemini-2.5-flash-lite-preview-09-2025"]
         plan = [m for m in preferred if m in avail]
-        return plan or avail or ["gemma-3-27b-it"]
+        return plan or avail or ["gemma-3-27b-it"], True
     except Exception:
-        return ["gemma-3n-e4b-it"]
+        return ["gemma-3n-e4b-it"], False
+
+
+def _store_plan(plan, ok: bool):
+    global _plan, _plan_ts
+    now = time.monotonic()
+    with _lock:
+        _plan = plan
+        _plan_ts = now if ok else now - MODEL_PLAN_TTL_S + MODEL_PLAN_RETRY_S
+
+
+def _refresh_plan_in_background():
+    global _refreshing
+    try:
+        _store_plan(*_discover_models())
+    finally:
+        _refreshing = False
+
+
+def pick_models(force_refresh: bool = False):
+    """
+    Cached model plan.
+    - first call (or force_refresh): discover synchronously
+    - stale (older than MODEL_PLAN_TTL_S): return the old plan and refresh in a daemon thread
+    """
+    global _refreshing
+    ensure_genai()
+    if _plan is None or force_refresh:
+        plan, ok = _discover_models()
+        _store_plan(plan, ok)
+        return list(plan)
+
+    if time.monotonic() - _plan_ts > MODEL_PLAN_TTL_S and not _refreshing:
+        with _lock:
+            if not _refreshing:
+                _refreshing = True
+                threading.Thread(target=_refresh_plan_in_background, daemon=True).start()
+    return list(_plan)
+
+
+def get_model(name: str):
+    """Reuse one GenerativeModel per model name."""
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = genai.GenerativeModel(name)
+                _models[name] = model
+    return model
+
+
+def _response_text(resp) -> str:
+    txt = getattr(resp, "text", None)
+    if not txt and getattr(resp, "candidates", None):
+        parts = getattr(resp.candidates[0].content, "parts", [])
+        if parts and hasattr(parts[0], "text"):
+            txt = parts[0].text
+    return (txt or "").strip()
+
+
+def _available(models, router):
+    """Routed plan without the models whose circuit is open."""
+    order = [m for m in route(models, router) if not BREAKERS.is_open(m)]
+    if not order:
+        raise CircuitOpen(f"all models skipped by open circuits: {', '.join(models)}")
+    return order
+
+
+def _admit(m: str, priority: str, timeout: float = None):
+    """Breaker, then scheduler; LLMBusy / CircuitOpen are local decisions, not model outcomes."""
+    if not BREAKERS.allow(m):
+        raise CircuitOpen(f"{m}: circuit open")
+    try:
+        SCHEDULER.acquire(m, priority, timeout)
+    except LLMBusy:
+        BREAKERS.release(m)
+        raise
+
+
+def _outcome(m: str, error: Exception = None):
+    SCHEDULER.record(m, error)
+    if error is None:
+        BREAKERS.success(m)
+    else:
+        BREAKERS.failure(m, error)
+
+
+def _hedge_admitter(priority: str):
+    """admit(model, hedge) for llm_router.hedged: hedges only go out if a slot is free now."""
+    return lambda m, hedge: _admit(m, priority, 0.0 if hedge else None)
+
+
+def _generate(m: str, prompt_text: str, config: dict, priority: str) -> str:
+    """One admitted, timed generate_content call on model m."""
+    _admit(m, priority)
+    return _call_admitted(m, prompt_text, config)
+
+
+def _call_admitted(m: str, prompt_text: str, config: dict) -> str:
+    """generate_content on m after _admit(): records the outcome and latency."""
+    t0 = time.monotonic()
+    settled = False  # outcome recorded (success or failure)
+    try:
+        resp = get_model(m).generate_content(prompt_text, generation_config=config)
+        _outcome(m)
+        settled = True
+    except Exception as e:
+        _outcome(m, e)
+        settled = True
+        ROUTER.record(m, time.monotonic() - t0, ok=False)
+        raise
+    finally:
+        if not settled:
+            BREAKERS.release(m)  # interrupted by a BaseException: don't hold a half-open probe
+    ROUTER.record(m, time.monotonic() - t0, ok=True)
+    return _response_text(resp)
+
+
+def gcall(prompt_text: str, models=None, max_tokens=450, temperature=0.6, cache=None, priority=None):
+    """
+    Minimal Gemini call with graceful fallback.
+    cache=None -> use the response cache only for deterministic calls (temperature == 0).
+    priority: "interactive" | "feedback" | "background" (default: the llm_priority() context).
+    Cache hits skip the scheduler; a full queue for one model moves on to the next.
+    Model order / hedging follow GEMINI_ROUTING (see core/llm_router.py); models with an
+    open circuit are skipped and every retry spends the shared budget (core/llm_breaker.py).
+    """
+    priority = priority or current_priority()
+    ensure_genai()
+    if models is None:
+        models = pick_models()
+    config = {"max_output_tokens": max_tokens, "temperature": temperature}
+    use_cache = CACHE_ENABLED and (cache if cache is not None else float(temperature) == 0.0)
+
+    if use_cache:
+        # any model in the plan that already answered this exact request wins
+        for m in models:
+            hit = RESPONSE_CACHE.get(make_key(m, prompt_text, config))
+            if hit is not None:
+                return hit, m
+
+    order = _available(models, ROUTER)
+    RETRY_BUDGET.deposit()
+    if ROUTING_MODE == "hedged" and len(order) > 1:
+        txt, m = hedged(partial(_call_admitted, prompt_text=prompt_text, config=config), order,
+                        HEDGE_POOLS[priority], may_retry=RETRY_BUDGET.try_spend,
+                        admit=_hedge_admitter(priority), skip=BREAKERS.release)
+    else:
+        txt, last_err = None, None
+        for k, m in enumerate(order):
+            if k and not RETRY_BUDGET.try_spend():
+                break
+            try:
+                txt = _generate(m, prompt_text, config, priority)
+                break
+            except Exception as e:
+                last_err = e
+        if txt is None:
+            raise last_err
+
+    if use_cache and txt:
+        RESPONSE_CACHE.put(make_key(m, prompt_text, config), m, txt)
+    return txt, m
+
+
+def _stream_pieces(resp):
+    """Text pieces of a streamed response, leading whitespace of the reply stripped."""
+    started = False
+    for chunk in resp:
+        try:
+            piece = chunk.text
+        except ValueError:
+            # chunk without text parts (e.g. finish/safety metadata)
+            continue
+        if not piece:
+            continue
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        yield piece
+
+
+def _stream_worker(m: str, prompt_text: str, config: dict, out: queue.Queue, cancel: threading.Event):
+    """
+    Hedged stream attempt, already admitted by the caller: puts (m, piece) ..., then (m, None)
+    at the end or (m, exc). Skipped if the race was decided before it started.
+    """
+    if cancel.is_set():
+        BREAKERS.release(m)
+        return
+    first = True
+    try:
+        t0 = time.monotonic()
+        settled = False
+        try:
+            resp = get_model(m).generate_content(prompt_text, generation_config=config, stream=True)
+            for piece in _stream_pieces(resp):
+                if first:
+                    TTFT_ROUTER.record(m, time.monotonic() - t0, ok=True)
+                    first = False
+                if cancel.is_set():
+                    break  # lost the race: stop reading, the rest of the stream is dropped
+                out.put((m, piece))
+            _outcome(m)
+            settled = True
+        except Exception as e:
+            _outcome(m, e)
+            settled = True
+            if first:
+                TTFT_ROUTER.record(m, time.monotonic() - t0, ok=False)
+            raise
+        finally:
+            if not settled:
+                BREAKERS.release(m)
+        out.put((m, None))
+    except Exception as e:
+        out.put((m, e))
+
 
-def gcall(prompt_text: str, models=None, max_tokens=450, temperature=0.6):
-    """Minimal Gemini call with graceful fallback."""
+def _gstream_hedged(prompt_text: str, models, config: dict, priority: str, winner: list):
+    """
+    Race on time to first chunk: the first model to produce text streams the reply, the
+    others are told to stop. A hedge starts when the leader is silent past its TTFT p95.
+    The winning model name is appended to `winner` (for the response cache).
+    """
+    order = TTFT_ROUTER.order(models)
+    out = queue.Queue()
+    cancels = {}
+    alive = set()
+    launched = 0
+    last_err = None
+    budget_left = True
+
+    pool = HEDGE_POOLS[priority]
+
+    def launch(hedge: bool = False) -> bool:
+        """Admit (on this thread) and submit the next model; False once plan or budget is used up."""
+        nonlocal launched, budget_left, last_err
+        while launched < len(order) and budget_left:
+            m = order[launched]
+            try:
+                _admit(m, priority, 0.0 if hedge else None)  # a hedge must not queue
+            except (LLMBusy, CircuitOpen) as e:
+                last_err = e
+                if hedge:
+                    return False  # m stays next in line (later hedge or fallback)
+                launched += 1
+                continue
+            if launched and not RETRY_BUDGET.try_spend():
+                BREAKERS.release(m)
+                budget_left = False
+                return False
+            launched += 1
+            cancels[m] = threading.Event()
+            alive.add(m)
+            pool.submit(_stream_worker, m, prompt_text, config, out, cancels[m])
+            return True
+        return False
+
+    if not launch():
+        raise last_err
+    try:
+        while True:
+            can_hedge = budget_left and not winner and launched < len(order) and len(alive) < MAX_INFLIGHT
+            try:
+                m, item = out.get(timeout=TTFT_ROUTER.hedge_delay(order[launched - 1]) if can_hedge else None)
+            except queue.Empty:
+                launch(hedge=True)  # TTFT p95 deadline passed
+                continue
+            if winner and m != winner[0]:
+                continue
+            if not winner and (item is None or isinstance(item, Exception)):
+                # failed (or empty) before producing text: drop it, fall through to the next model
+                alive.discard(m)
+                if isinstance(item, Exception):
+                    last_err = item
+                    if len(alive) < MAX_INFLIGHT:
+                        launch()  # next model at once, even while another attempt is pending
+                if not alive:
+                    if last_err is not None:
+                        raise last_err
+                    return
+                continue
+            if not winner:
+                winner.append(m)
+                for other in alive - {m}:
+                    cancels[other].set()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item  # the winner failed mid-reply
+            yield item
+    finally:
+        for ev in cancels.values():
+            ev.set()
+
+
+def gstream(prompt_text: str, models=None, max_tokens=450, temperature=0.6, priority=None):
+    """
+    Streaming variant of gcall: yields text chunks as they arrive.
+    Falls back to the next model only if the current one failed before yielding anything
+    (once text is on screen we cannot switch models mid-reply).
+    """
+    priority = priority or current_priority()
     ensure_genai()
     if models is None:
         models = pick_models()
+    config = {"max_output_tokens": max_tokens, "temperature": temperature}
+    use_cache = CACHE_ENABLED and float(temperature) == 0.0
+
+    if use_cache:
+        for m in models:
+            hit = RESPONSE_CACHE.get(make_key(m, prompt_text, config))
+            if hit is not None:
+                yield hit
+                return
+
+    order = _available(models, TTFT_ROUTER)
+    RETRY_BUDGET.deposit()
+    if ROUTING_MODE == "hedged" and len(order) > 1:
+        winner = []
+        chunks = []
+        for piece in _gstream_hedged(prompt_text, order, config, priority, winner):
+            chunks.append(piece)
+            yield piece
+        if use_cache and chunks:
+            RESPONSE_CACHE.put(make_key(winner[0], prompt_text, config), winner[0], "".join(chunks).strip())
+        return
+
     last_err = None
-    for m in models:
+    for k, m in enumerate(order):
+        if k and not RETRY_BUDGET.try_spend():
+            break
+        started = False
+        chunks = []
+        try:
+            _admit(m, priority)
+        except (LLMBusy, CircuitOpen) as e:
+            last_err = e
+            continue
+        t0 = time.monotonic()
+        settled = False
         try:
-            model = genai.GenerativeModel(m)
-            resp = model.generate_content(
-                prompt_text,
-                generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
-            )
-            txt = getattr(resp, "text", None)
-            if not txt and getattr(resp, "candidates", None):
-                parts = getattr(resp.candidates[0].content, "parts", [])
-                if parts and hasattr(parts[0], "text"):
-                    txt = parts[0].text
-            return (txt or "").strip(), m
+            model = get_model(m)
+            resp = model.generate_content(prompt_text, generation_config=config, stream=True)
+            for piece in _stream_pieces(resp):
+                if not started:
+                    TTFT_ROUTER.record(m, time.monotonic() - t0, ok=True)
+                    started = True
+                chunks.append(piece)
+                yield piece
+            _outcome(m)
+            settled = True
+            if use_cache and chunks:
+                RESPONSE_CACHE.put(make_key(m, prompt_text, config), m, "".join(chunks).strip())
+            return
         except Exception as e:
+            _outcome(m, e)
+            settled = True
+            if started:
+                raise
+            TTFT_ROUTER.record(m, time.monotonic() - t0, ok=False)
             last_err = e
             continue
-    raise last_err
\ No newline at end of file
+        finally:
+            if not settled:
+                # consumer abandoned the stream (GeneratorExit on a Streamlit rerun/Stop)
+                BREAKERS.release(m)
+    raise last_err
+
+
+def routing_stats() -> dict:
+    return {"mode": ROUTING_MODE, "call": ROUTER.stats(), "stream_ttft": TTFT_ROUTER.stats()}
+
+
+def llm_status() -> dict:
+    """Snapshot of the process-wide LLM client: breakers, retry budget, scheduler, routing."""
+    return {
+        "plan": list(_plan or []),
+        "breakers": BREAKERS.status(),
+        "retry_budget": RETRY_BUDGET.status(),
+        "scheduler": scheduler_stats(),
+        "routing": routing_stats(),
+    }
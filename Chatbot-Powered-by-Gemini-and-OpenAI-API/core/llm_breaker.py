@@ -0,0 +1,188 @@
+"""
+Per-model circuit breakers + a shared retry budget for the core.llm fallback chain.
+
+Breaker states:
+  closed     calls go through; FAILURE_THRESHOLD consecutive failures -> open
+  open       calls skip the model until the open period ends; the period grows with
+             every consecutive trip (OPEN_BASE_S * 2**(trips-1), capped at OPEN_MAX_S)
+             and is jittered so workers don't probe a recovering model in lockstep
+  half_open  one probe call is let through: success -> closed, failure -> open again
+             (a probe silent for PROBE_TIMEOUT_S no longer blocks the next one)
+
+Retry budget: every first attempt deposits RETRY_RATIO of a token, every retry (next model
+after a failure, or a hedge) spends one. With the budget empty a failed call raises at once
+instead of multiplying load on a struggling backend.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+OPEN_BASE_S = float(os.getenv("LLM_BREAKER_OPEN_S", "5"))
+OPEN_MAX_S = 120.0
+PROBE_TIMEOUT_S = 60.0  # a half-open probe that never reports back frees its slot after this
+JITTER = 0.5            # open period * uniform(1 - JITTER, 1 + JITTER)
+
+RETRY_RATIO = 0.2       # retries allowed per first attempt, long-run
+RETRY_MIN_TOKENS = 10.0  # budget floor refilled over time so a quiet process can still retry
+RETRY_MAX_TOKENS = 100.0
+RETRY_REFILL_PER_S = 0.1
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(RuntimeError):
+    """The model (or every model in the plan) is skipped by an open circuit."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, rng: Optional[random.Random] = None):
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0       # consecutive, while closed
+        self.trips = 0          # consecutive open periods (drives the backoff)
+        self.open_until = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+        self.last_error = ""
+        self.counts = {"success": 0, "failure": 0, "skipped": 0}
+        self._rng = rng or random.Random()
+
+    def _open(self, now: float):
+        self.trips += 1
+        period = min(OPEN_MAX_S, OPEN_BASE_S * 2 ** (self.trips - 1))
+        self.open_until = now + period * self._rng.uniform(1 - JITTER, 1 + JITTER)
+        self.state = OPEN
+        self.probing = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self.probe_active(now):
+            self.probing = True
+            self.probe_started = now
+            return True
+        self.counts["skipped"] += 1
+        return False
+
+    def probe_active(self, now: float) -> bool:
+        return self.probing and now - self.probe_started < PROBE_TIMEOUT_S
+
+    def release(self):
+        """The allowed call never reached the model (e.g. scheduler backpressure)."""
+        self.probing = False
+
+    def success(self):
+        self.counts["success"] += 1
+        self.state, self.failures, self.trips, self.probing = CLOSED, 0, 0, False
+
+    def failure(self, now: float, error: BaseException):
+        self.counts["failure"] += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if self.state == HALF_OPEN:
+            self._open(now)
+            return
+        self.failures += 1
+        if self.state == CLOSED and self.failures >= FAILURE_THRESHOLD:
+            self.failures = 0
+            self._open(now)
+
+    def status(self, now: float) -> Dict:
+        return {
+            "state": self.state,
+            "retry_in_s": round(max(0.0, self.open_until - now), 1) if self.state == OPEN else 0.0,
+            "trips": self.trips,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            **self.counts,
+        }
+
+
+class BreakerBoard:
+    """All breakers of the process, one per model name."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model: str) -> CircuitBreaker:
+        b = self._breakers.get(model)
+        if b is None:
+            b = self._breakers[model] = CircuitBreaker(model)
+        return b
+
+    def allow(self, model: str) -> bool:
+        with self._lock:
+            return self._get(model).allow(time.monotonic())
+
+    def release(self, model: str):
+        with self._lock:
+            self._get(model).release()
+
+    def success(self, model: str):
+        with self._lock:
+            self._get(model).success()
+
+    def failure(self, model: str, error: BaseException):
+        with self._lock:
+            self._get(model).failure(time.monotonic(), error)
+
+    def is_open(self, model: str) -> bool:
+        """True while calls to `model` are skipped (counted as a skip; no state change)."""
+        with self._lock:
+            b = self._breakers.get(model)
+            if b is None or b.state == CLOSED:
+                return False
+            now = time.monotonic()
+            skip = b.probe_active(now) or (b.state == OPEN and now < b.open_until)
+            b.counts["skipped"] += skip
+            return skip
+
+    def status(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return {m: b.status(now) for m, b in self._breakers.items()}
+
+
+class RetryBudget:
+    def __init__(self):
+        self.tokens = RETRY_MIN_TOKENS
+        self.stamp = time.monotonic()
+        self.spent = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.tokens < RETRY_MIN_TOKENS:
+            self.tokens = min(RETRY_MIN_TOKENS, self.tokens + (now - self.stamp) * RETRY_REFILL_PER_S)
+        self.stamp = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(RETRY_MAX_TOKENS, self.tokens + RETRY_RATIO)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.spent += 1
+                return True
+            self.denied += 1
+            return False
+
+    def status(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {"tokens": round(self.tokens, 2), "spent": self.spent, "denied": self.denied}
+
+
+BREAKERS = BreakerBoard()
+RETRY_BUDGET = RetryBudget()
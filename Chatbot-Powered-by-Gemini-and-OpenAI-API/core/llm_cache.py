@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "cache"
+CACHE_DB = CACHE_DIR / "llm_responses.sqlite"
+
+# knobs (env overridable)
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+MEM_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MEM_ENTRIES", "2048"))
+DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MB", "64")) * 1024 * 1024
+
+
+def make_key(model: str, prompt_text: str, generation_config: Dict) -> str:
+    """Content address: sha256 over (model, sha256(prompt), sorted generation config)."""
+    prompt_hash = hashlib.sha256((prompt_text or "").encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        {"model": model, "prompt": prompt_hash, "config": generation_config},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for deterministic LLM responses.
+      tier 1: in-memory LRU (OrderedDict), bounded by entry count
+      tier 2: SQLite file, bounded by total response bytes (least recently used evicted first)
+    """
+
+    def __init__(self, db_path: Path = CACHE_DB, mem_max_entries: int = MEM_MAX_ENTRIES,
+                 disk_max_bytes: int = DISK_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.mem_max_entries = mem_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._mem: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self.counters = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    # SQLite tier
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None:
+            return self._conn
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+                " nbytes INTEGER, created REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+            conn.commit()
+            self._disk_bytes = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        except sqlite3.Error:
+            # read-only deploy / locked file -> memory tier only
+            self._conn = None
+        return self._conn
+
+    def _evict_disk(self, conn: sqlite3.Connection):
+        target = int(self.disk_max_bytes * 0.9)
+        rows = conn.execute("SELECT key, nbytes FROM responses ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, nbytes in rows:
+            if self._disk_bytes <= target:
+                break
+            doomed.append((key,))
+            self._disk_bytes -= nbytes or 0
+        if doomed:
+            conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self.counters["evictions"] += len(doomed)
+
+    # Memory tier
+    def _mem_put(self, key: str, value: str):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_max_entries:
+            self._mem.popitem(last=False)
+
+    # Public API
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.counters["mem_hits"] += 1
+                return self._mem[key]
+
+            conn = self._db()
+            if conn is not None:
+                try:
+                    row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                        conn.commit()
+                        self._mem_put(key, row[0])
+                        self.counters["disk_hits"] += 1
+                        return row[0]
+                except sqlite3.Error:
+                    pass
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, model: str, response: str):
+        with self._lock:
+            self._mem_put(key, response)
+            self.counters["writes"] += 1
+
+            conn = self._db()
+            if conn is None:
+                return
+            nbytes = len(response.encode("utf-8"))
+            now = time.time()
+            try:
+                old = conn.execute("SELECT nbytes FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses(key, model, response, nbytes, created, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, nbytes, now, now),
+                )
+                self._disk_bytes += nbytes - (old[0] if old else 0)
+                if self._disk_bytes > self.disk_max_bytes:
+                    self._evict_disk(conn)
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM responses")
+                conn.commit()
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.counters["mem_hits"] + self.counters["disk_hits"]
+            total = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": (hits / total) if total else 0.0,
+                "mem_entries": len(self._mem),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+# process-wide instance used by core.llm.gcall
+RESPONSE_CACHE = ResponseCache()
+
+
+def cache_stats() -> Dict:
+    return RESPONSE_CACHE.stats()
@@ -0,0 +1,96 @@
+"""
+LLM-as-rater: score one dataset session on the assess METRIC_FIELDS (1–5), the same
+form raters fill in on pages/02_Assess.py. Deterministic (temperature 0), so repeated
+runs hit core.llm_cache.
+
+meaning_preserve ("Maintains Original Meaning") needs the pre-rewrite dialogue, which the
+bundled datasets don't carry, so machine rows leave it empty (NaN in results/agreement).
+"""
+from __future__ import annotations
+
+import json
+from typing import Callable, Dict, List
+
+from .logs_assess import METRIC_FIELDS
+
+# metrics the model can judge from the rewritten session alone
+LLM_METRIC_FIELDS = [m for m in METRIC_FIELDS if m != "meaning_preserve"]
+
+RATER_SYSTEM = """
+You are an expert reviewer of counseling conversations. The conversation is a student
+counseling dialogue rewritten for a specific cultural background. Rate it on a 1–5 scale
+(1 = Poor, 3 = Acceptable, 5 = Excellent) for each criterion:
+
+- empathy_warmth: the counselor conveys warmth, understanding and care
+- clarity_helpfulness: replies are clear and genuinely helpful to the client
+- safety_nonjudgment: the counselor is non-judgmental and responds safely to any risk
+- cultural_appropriateness: language and content fit the stated cultural background
+- specificity_nostereotype: details are specific to this client, not stereotypical
+
+Return STRICT JSON with exactly these fields:
+{"empathy_warmth": 1-5, "clarity_helpfulness": 1-5, "safety_nonjudgment": 1-5,
+ "cultural_appropriateness": 1-5, "specificity_nostereotype": 1-5,
+ "comment": "one short sentence on what felt authentic / what felt off"}
+Output JSON only.
+""".strip()
+
+MAX_TRANSCRIPT_CHARS = 24000
+
+
+def transcript(turns: List[Dict], max_chars: int = MAX_TRANSCRIPT_CHARS) -> str:
+    """CLIENT/COUNSELOR lines from core_ui.dataset turns; long sessions keep head + tail."""
+    lines = [f"{'CLIENT' if t.get('speaker') == 'client' else 'COUNSELOR'}: {t.get('text', '')}" for t in turns]
+    txt = "\n".join(lines)
+    if len(txt) <= max_chars:
+        return txt
+    half = max_chars // 2
+    return f"{txt[:half]}\n[... middle of the conversation omitted ...]\n{txt[-half:]}"
+
+
+def rater_prompt(turns: List[Dict], culture: str) -> str:
+    return f"""{RATER_SYSTEM}
+
+Cultural background: {culture}
+
+Conversation:
+\"\"\"{transcript(turns)}\"\"\"
+
+JSON:"""
+
+
+def parse_rating_json(text: str) -> Dict[str, str]:
+    """
+    Strict parser for RATER_SYSTEM output -> {metric: "1".."5", "comment": str}
+    (strings, like the rows written by the Assess form; metrics outside LLM_METRIC_FIELDS
+    are ""). Raises ValueError otherwise.
+    """
+    t = (text or "").strip()
+    s, e = t.find("{"), t.rfind("}")
+    if s == -1 or e == -1:
+        raise ValueError("no JSON object in rater reply")
+    data = json.loads(t[s:e + 1])
+    out = {m: "" for m in METRIC_FIELDS}
+    for m in LLM_METRIC_FIELDS:
+        v = data.get(m)
+        if isinstance(v, str) and v.strip().isdigit():
+            v = int(v.strip())
+        if isinstance(v, bool) or not isinstance(v, int) or not 1 <= v <= 5:
+            raise ValueError(f"{m}: expected 1-5, got {v!r}")
+        out[m] = str(v)
+    comment = data.get("comment", "")
+    out["comment"] = comment.strip() if isinstance(comment, str) else ""
+    return out
+
+
+def rate_session(gcall: Callable, turns: List[Dict], culture: str, retries: int = 1) -> Dict[str, str]:
+    """Scores for one session; a malformed reply is retried once with a nudge, then raises ValueError."""
+    prompt = rater_prompt(turns, culture)
+    for attempt in range(retries + 1):
+        out, _ = gcall(prompt, max_tokens=300, temperature=0.0)
+        try:
+            return parse_rating_json(out)
+        except ValueError:
+            if attempt == retries:
+                raise
+            # different prompt -> not served from the response cache again
+            prompt = prompt + "\nReturn ONLY the JSON object with integer scores 1-5."
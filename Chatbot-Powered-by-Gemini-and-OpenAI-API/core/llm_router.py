@@ -0,0 +1,188 @@
+"""
+Latency-aware model routing + hedged requests for core.llm (opt-in via GEMINI_ROUTING).
+
+GEMINI_ROUTING:
+  "fallback"  plan order, next model only after an exception (default, old behaviour)
+  "latency"   fastest healthy model first (rolling median latency), still one at a time
+  "hedged"    like "latency", plus a duplicate request to the next model when the first
+              hasn't answered by its rolling p95; the first success wins
+
+Per model we keep the last WINDOW outcomes (seconds, ok). A model is unhealthy once it has
+MIN_SAMPLES outcomes and more than MAX_ERROR_RATE of them failed; unhealthy models go last.
+Losers of a hedge are only cancelled if they haven't started: a blocking SDK call cannot be
+interrupted, it finishes in its pool thread and its answer is dropped (its latency still counts).
+
+Admission (breaker + scheduler) happens on the caller's thread before an attempt is submitted,
+so pool workers only ever run SDK calls; each priority class has its own pool so background
+losers still finishing can't delay interactive attempts.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .llm_scheduler import PRIORITIES
+
+ROUTING_MODES = ["fallback", "latency", "hedged"]
+ROUTING_MODE = os.getenv("GEMINI_ROUTING", "fallback")
+if ROUTING_MODE not in ROUTING_MODES:
+    ROUTING_MODE = "fallback"
+
+WINDOW = 50
+MIN_SAMPLES = 5
+MAX_ERROR_RATE = 0.5
+HEDGE_QUANTILE = 0.95
+HEDGE_DEFAULT_S = 4.0   # no latency history yet
+HEDGE_MIN_S = 0.3
+HEDGE_MAX_S = 20.0
+MAX_INFLIGHT = 2        # original + one hedge
+
+# hedged attempts run here (the caller's thread admits and waits), one pool per priority
+HEDGE_WORKERS = int(os.getenv("GEMINI_HEDGE_WORKERS", "16"))
+HEDGE_POOLS = {p: ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix=f"llm-hedge-{p}")
+               for p in PRIORITIES}
+
+
+class LatencyRouter:
+    """Rolling latency / error window per model."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._obs: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float, ok: bool):
+        with self._lock:
+            q = self._obs.get(model)
+            if q is None:
+                q = self._obs[model] = deque(maxlen=self.window)
+            q.append((float(seconds), bool(ok)))
+
+    def _snapshot(self, model: str) -> List[Tuple[float, bool]]:
+        with self._lock:
+            return list(self._obs.get(model, ()))
+
+    def quantile(self, model: str, q: float) -> Optional[float]:
+        """Latency quantile over successful calls (None below MIN_SAMPLES)."""
+        lat = [s for s, ok in self._snapshot(model) if ok]
+        return float(np.quantile(lat, q)) if len(lat) >= MIN_SAMPLES else None
+
+    def error_rate(self, model: str) -> Optional[float]:
+        obs = self._snapshot(model)
+        return sum(not ok for _, ok in obs) / len(obs) if obs else None
+
+    def healthy(self, model: str) -> bool:
+        obs = self._snapshot(model)
+        if len(obs) < MIN_SAMPLES:
+            return True
+        return sum(not ok for _, ok in obs) / len(obs) <= MAX_ERROR_RATE
+
+    def order(self, models: Sequence[str]) -> List[str]:
+        """Healthy models by median latency, models without history next (plan order), unhealthy last."""
+        def key(item):
+            pos, m = item
+            if not self.healthy(m):
+                return (2, 0.0, pos)
+            p50 = self.quantile(m, 0.5)
+            return (1, 0.0, pos) if p50 is None else (0, p50, pos)
+        return [m for _, m in sorted(enumerate(models), key=key)]
+
+    def hedge_delay(self, model: str) -> float:
+        p = self.quantile(model, HEDGE_QUANTILE)
+        return HEDGE_DEFAULT_S if p is None else min(HEDGE_MAX_S, max(HEDGE_MIN_S, p))
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            models = list(self._obs)
+        out = {}
+        for m in models:
+            err = self.error_rate(m)
+            out[m] = {
+                "n": len(self._snapshot(m)),
+                "p50_s": self.quantile(m, 0.5),
+                "p95_s": self.quantile(m, 0.95),
+                "error_rate": None if err is None else round(err, 3),
+                "healthy": self.healthy(m),
+            }
+        return out
+
+
+# full-call latency (gcall) and time to first chunk (gstream) are tracked separately
+ROUTER = LatencyRouter()
+TTFT_ROUTER = LatencyRouter()
+
+
+def route(models: Sequence[str], router: LatencyRouter = ROUTER, mode: str = None) -> List[str]:
+    mode = mode or ROUTING_MODE
+    return list(models) if mode == "fallback" else router.order(models)
+
+
+def hedged(attempt: Callable[[str], object], models: Sequence[str], pool: ThreadPoolExecutor,
+           router: LatencyRouter = ROUTER, may_retry: Callable[[], bool] = lambda: True,
+           admit: Callable[[str, bool], None] = lambda m, hedge: None,
+           skip: Callable[[str], None] = lambda m: None):
+    """
+    attempt(model) -> result (blocking; raises on failure). Returns (result, model) of the
+    first success. A failure launches the next model at once; silence past the last-launched
+    model's p95 launches a hedge (at most MAX_INFLIGHT attempts at a time).
+    Every launch after the first needs may_retry() (the shared retry budget).
+    admit(model, hedge) runs on this thread before a submit and raises to refuse the model
+    (a hedge should not queue); skip(model) undoes it for an attempt cancelled before it started.
+    """
+    order = router.order(models)
+    pending = {}
+    launched = 0
+    last_err = None
+    budget_left = True
+
+    def launch(hedge: bool = False) -> bool:
+        """Submit the next admissible model; False once the plan or the budget is used up."""
+        nonlocal launched, budget_left, last_err
+        while launched < len(order) and budget_left:
+            m = order[launched]
+            try:
+                admit(m, hedge)
+            except Exception as e:
+                last_err = e
+                if hedge:
+                    return False  # no capacity right now: m stays next in line (hedge or fallback)
+                launched += 1
+                continue
+            if launched and not may_retry():
+                skip(m)
+                budget_left = False
+                return False
+            launched += 1
+            pending[pool.submit(attempt, m)] = m
+            return True
+        return False
+
+    launch()
+    while pending:
+        can_hedge = budget_left and launched < len(order) and len(pending) < MAX_INFLIGHT
+        timeout = router.hedge_delay(order[launched - 1]) if can_hedge else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            launch(hedge=True)  # p95 deadline passed
+            continue
+        failed = False
+        for fut in done:
+            m = pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                last_err = e
+                failed = True
+                continue
+            for other, om in pending.items():
+                if other.cancel():
+                    skip(om)
+            return result, m
+        if failed and len(pending) < MAX_INFLIGHT:
+            launch()
+    raise last_err
@@ -0,0 +1,193 @@
+"""
+Process-wide admission control for LLM requests (used by core.llm.gcall / gstream).
+
+- token bucket per model: at most `rate` requests/s with bursts up to `burst`
+- priority classes: interactive > feedback > background; a free token always goes to
+  the oldest waiter of the highest non-empty class
+- bounded wait queues per class: a full queue raises LLMBusy instead of piling up
+- 429-aware AIMD: a throttled reply halves the model's rate and drains its bucket,
+  every success adds back a small step until the configured rate is reached
+
+Priority comes from the `priority=` argument or the llm_priority() context (contextvars
+don't follow work into thread pools: use with_priority() for pool/executor callables).
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Deque, Dict, Optional
+
+PRIORITIES = ["interactive", "feedback", "background"]
+
+SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER", "1") != "0"
+RATE_RPS = float(os.getenv("LLM_RATE_RPS", "2.0"))         # per model
+RATE_BURST = float(os.getenv("LLM_RATE_BURST", "4"))
+MIN_RATE_RPS = float(os.getenv("LLM_MIN_RATE_RPS", "0.1"))
+RECOVERY_STEP = 0.05  # of the configured rate, added back per success
+
+QUEUE_LIMITS = {
+    "interactive": int(os.getenv("LLM_QUEUE_INTERACTIVE", "64")),
+    "feedback": int(os.getenv("LLM_QUEUE_FEEDBACK", "64")),
+    "background": int(os.getenv("LLM_QUEUE_BACKGROUND", "32")),
+}
+WAIT_TIMEOUT_S = {"interactive": 30.0, "feedback": 60.0, "background": 300.0}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="interactive")
+
+
+class LLMBusy(RuntimeError):
+    """Request rejected by the scheduler (queue full or waited past the class timeout)."""
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def llm_priority(priority: str):
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown LLM priority {priority!r}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_priority(priority: str, fn: Callable) -> Callable:
+    """Wrap fn so it runs under llm_priority(priority) in whatever thread calls it."""
+    @wraps(fn)
+    def run(*args, **kwargs):
+        with llm_priority(priority):
+            return fn(*args, **kwargs)
+    return run
+
+
+def is_throttle_error(e: BaseException) -> bool:
+    """429 / quota errors (google.api_core ResourceExhausted and friends)."""
+    if getattr(e, "code", None) == 429 or type(e).__name__ in {"ResourceExhausted", "TooManyRequests"}:
+        return True
+    msg = str(e)
+    return "429" in msg or "quota" in msg.lower()
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+        self.queues: Dict[str, Deque[object]] = {p: deque() for p in PRIORITIES}
+        self.granted = {p: 0 for p in PRIORITIES}
+        self.rejected = {p: 0 for p in PRIORITIES}
+        self.throttled = 0
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def head(self) -> Optional[object]:
+        for p in PRIORITIES:
+            if self.queues[p]:
+                return self.queues[p][0]
+        return None
+
+
+class LLMScheduler:
+    def __init__(self, rate: float = RATE_RPS, burst: float = RATE_BURST,
+                 queue_limits: Optional[Dict[str, int]] = None, enabled: bool = SCHEDULER_ENABLED):
+        self.rate = rate
+        self.burst = burst
+        self.queue_limits = dict(queue_limits or QUEUE_LIMITS)
+        self.enabled = enabled
+        self._buckets: Dict[str, _Bucket] = {}
+        self._cond = threading.Condition()
+
+    def _bucket(self, model: str) -> _Bucket:
+        b = self._buckets.get(model)
+        if b is None:
+            b = self._buckets[model] = _Bucket(self.rate, self.burst)
+        return b
+
+    def acquire(self, model: str, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """Block until `model` may be called at this priority; raises LLMBusy on backpressure."""
+        if not self.enabled:
+            return
+        priority = priority or current_priority()
+        timeout = WAIT_TIMEOUT_S[priority] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        ticket = object()
+        with self._cond:
+            b = self._bucket(model)
+            q = b.queues[priority]
+            if len(q) >= self.queue_limits[priority]:
+                b.rejected[priority] += 1
+                raise LLMBusy(f"{model}: {priority} queue full ({len(q)} waiting)")
+            q.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    b.refill(now)
+                    if b.head() is ticket and b.tokens >= 1.0:
+                        b.tokens -= 1.0
+                        q.popleft()
+                        b.granted[priority] += 1
+                        return
+                    if now >= deadline:
+                        b.rejected[priority] += 1
+                        raise LLMBusy(f"{model}: {priority} request waited {timeout:.0f}s")
+                    wait = deadline - now
+                    if b.head() is ticket:
+                        wait = min(wait, (1.0 - b.tokens) / b.rate)
+                    self._cond.wait(max(wait, 0.001))
+            except BaseException:
+                if ticket in q:
+                    q.remove(ticket)
+                raise
+            finally:
+                self._cond.notify_all()  # next head re-checks the bucket
+
+    def record(self, model: str, error: Optional[BaseException] = None):
+        """Feed the outcome of a call back: 429 -> multiplicative decrease, success -> additive increase."""
+        if not self.enabled:
+            return
+        with self._cond:
+            b = self._bucket(model)
+            b.refill(time.monotonic())
+            if error is not None and is_throttle_error(error):
+                b.throttled += 1
+                b.rate = max(MIN_RATE_RPS, b.rate / 2.0)
+                b.tokens = min(b.tokens, 0.0)
+            elif error is None and b.rate < b.base_rate:
+                b.rate = min(b.base_rate, b.rate + RECOVERY_STEP * b.base_rate)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._cond:
+            now = time.monotonic()
+            out = {}
+            for m, b in self._buckets.items():
+                b.refill(now)
+                out[m] = {
+                    "rate_rps": round(b.rate, 3),
+                    "base_rate_rps": b.base_rate,
+                    "tokens": round(b.tokens, 2),
+                    "waiting": {p: len(q) for p, q in b.queues.items()},
+                    "granted": dict(b.granted),
+                    "rejected": dict(b.rejected),
+                    "throttled": b.throttled,
+                }
+            return out
+
+
+SCHEDULER = LLMScheduler()
+
+
+def scheduler_stats() -> Dict[str, Dict]:
+    return SCHEDULER.stats()
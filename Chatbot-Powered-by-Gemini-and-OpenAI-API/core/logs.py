@@ -1,60 +1,55 @@
-import os, csv
+import os
 from datetime import datetime
-import streamlit as st
+
+from .appendlog import append_row
 
 # from care_gemini import effective_mode_from_state
 
 os.makedirs("logs", exist_ok=True)
 
+TURN_LABEL_FIELDS = ["empathy", "reflection", "validation", "open_question", "suggestion"]
+
 
-def _effective_mode_from_state(st)->str:
+def _effective_mode_from_state(ss)->str:
     """Avoid circular import: compute mode directly from session_state."""
-    ph = st.session_state.get("phase", "Practice")
+    ph = ss.get("phase", "Practice")
     if ph != "Practice":
         return "Practice only"
-    return(st.session_state.get("mode")
-            or st.session_state.get("mode_radio")
+    return(ss.get("mode")
+            or ss.get("mode_radio")
             or "Practice only")
 
-def log_turn(st_mod, counselor_text: str, labels: dict):
-    ss = st_mod.session_state
-    path = os.path.join("logs", "turns.csv")
+# Row builders: read session_state on the script thread, so the rows can be
+# written later from a background job without touching st.session_state.
+def turn_row(ss, counselor_text: str, labels: dict | None = None) -> dict:
+    labels = labels or {}
     row = {
         "ts": datetime.now().isoformat(timespec="seconds"),
-        "session_id": st.session_state["session_id"],
-        "mode": _effective_mode_from_state(),
-        # "mode": effective_mode(),
-        "scenario": st.session_state["scenario"],
-        "phase": ss.session_state.get("phase", "practice"),
-        "turn_idx": len(st.session_state.get("counselor_msgs", [])),
+        "session_id": ss["session_id"],
+        "mode": _effective_mode_from_state(ss),
+        "scenario": ss["scenario"],
+        "phase": ss.get("phase", "practice"),
+        "turn_idx": len(ss.get("counselor_msgs", [])),
         "text": counselor_text.replace("\n", " ").strip(),
-        "empathy":       int(labels.get("empathy", 0)),
-        "reflection":    int(labels.get("reflection", 0)),
-        "validation":    int(labels.get("validation", 0)),
-        "open_question": int(labels.get("open_question", 0)),
-        "suggestion":    int(labels.get("suggestion", 0)),
     }
-    new = not os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=row.keys())
-        if new:
-            w.writeheader()
-        w.writerow(row)
+    row.update(turn_label_columns(labels))
+    return row
 
-def log_session_snapshot(st_mod):
-    ss = st_mod.session_state
-    path = os.path.join("logs", "sessions.csv")
-    ms = ss.session_state.get("metrics_summary", {})
-    c_words = sum(len(t.split()) for t in st.session_state.get("counselor_msgs", [])) or 1
-    gap_words = st.session_state.get("session_metrics", {}).get("gap_words", 0)
+def turn_label_columns(labels: dict) -> dict:
+    return {k: int(labels.get(k, 0)) for k in TURN_LABEL_FIELDS}
+
+def session_row(ss) -> dict:
+    ms = ss.get("metrics_summary", {})
+    c_words = sum(len(t.split()) for t in ss.get("counselor_msgs", [])) or 1
+    gap_words = ss.get("session_metrics", {}).get("gap_words", 0)
     t_gap = round(gap_words / c_words, 4)
-    row = {
+    return {
         "ts": datetime.now().isoformat(timespec="seconds"),
-        "session_id": st.session_state["session_id"],
-        "mode": _effective_mode_from_state(st),
-        "scenario": st.session_state["scenario"],
-        "phase": st.session_state.get("phase", "practice"),
-        "turns": len(st.session_state.get("counselor_msgs", [])),
+        "session_id": ss["session_id"],
+        "mode": _effective_mode_from_state(ss),
+        "scenario": ss["scenario"],
+        "phase": ss.get("phase", "practice"),
+        "turns": len(ss.get("counselor_msgs", [])),
         "Empathy":       float(ms.get("Empathy", 0)),
         "Reflection":    float(ms.get("Reflection", 0)),
         "Open Questions":float(ms.get("Open Questions", 0)),
@@ -64,9 +59,13 @@ def log_session_snapshot(st_mod):
         "T_GAP": t_gap,
         "CounselorWords": c_words,
     }
-    new = not os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=row.keys())
-        if new:
-            w.writeheader()
-        w.writerow(row)
\ No newline at end of file
+
+def write_row(filename: str, row: dict, log_dir: str = "logs"):
+    # locked, single-write append (optionally buffered, see core.appendlog)
+    append_row(os.path.join(log_dir, filename), row)
+
+def log_turn(st_mod, counselor_text: str, labels: dict):
+    write_row("turns.csv", turn_row(st_mod.session_state, counselor_text, labels))
+
+def log_session_snapshot(st_mod):
+    write_row("sessions.csv", session_row(st_mod.session_state))
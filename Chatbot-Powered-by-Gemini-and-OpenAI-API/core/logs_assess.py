@@ -1,14 +1,27 @@
 from __future__ import annotations
 
 import csv
-from dataclasses import dataclass
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Dict, List, Set, Tuple
+
+
+from .appendlog import get_log
+from .assess_store import AssessStore, complete_records, csv_signature
 
 
 LOG_DIR = Path(__file__).resolve().parents[1] / "logs"
 ASSESS_CSV = LOG_DIR / "assess_sessions.csv"
+ASSESS_DB = LOG_DIR / "assess_sessions.sqlite"
+
+# "sqlite": indexed mirror of the CSV (default)
+# "view":   in-process materialized views fed by tail-reading the CSV
+# "csv":    rescan the CSV on every read
+ASSESS_BACKEND = os.getenv("ASSESS_BACKEND", "sqlite")
 
 
 # 6 metrics (session-level)
@@ -22,6 +35,10 @@ METRIC_FIELDS = [
 ]
 
 
+# Reserved rater_id for machine (LLM-as-rater) rows; core_ui.auth rejects ':' in the email local part
+LLM_RATER_ID = "llm:baseline"
+
+
 CSV_FIELDS = [
     "timestamp_utc",
     "email",
@@ -35,6 +52,135 @@ CSV_FIELDS = [
 ]
 
 
+@dataclass
+class RaterView:
+    """Materialized state for one (rater_id, culture)."""
+    rows: List[Dict] = field(default_factory=list)
+    rated_ids: Set[str] = field(default_factory=set)
+    latest: Dict[str, Dict] = field(default_factory=dict)
+
+
+class AssessView:
+    """
+    Alternative to the SQLite store: per-process views over assess_sessions.csv.
+    A byte-offset cursor parses only rows appended since the last refresh; each row
+    updates its (rater_id, culture) view, so lookups are dict/set reads.
+    Readers copy what they return under the same lock sync() mutates it with.
+    Same query interface as AssessStore.
+    """
+
+    def __init__(self, csv_path: Path):
+        self.csv_path = Path(csv_path)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0
+        self._sig = ""
+        self._header: List[str] = []
+        self._all: List[Dict] = []
+        self._views: Dict[Tuple[str, str], RaterView] = {}
+        self._by_rater: Dict[str, List[Dict]] = {}
+        self._last: Dict[str, Tuple[str, str]] = {}  # rater_id -> (timestamp_utc, culture)
+
+    def _apply(self, row: Dict):
+        rid = (row.get("rater_id", "") or "").strip()
+        culture = (row.get("culture", "") or "").strip()
+        sid = str(row.get("session_id", "")).strip()
+        ts = row.get("timestamp_utc", "") or ""
+
+        self._all.append(row)
+        self._by_rater.setdefault(rid, []).append(row)
+        v = self._views.setdefault((rid, culture), RaterView())
+        v.rows.append(row)
+        if sid:
+            v.rated_ids.add(sid)
+            if sid not in v.latest or ts > (v.latest[sid].get("timestamp_utc", "") or ""):
+                v.latest[sid] = row
+        if ts > self._last.get(rid, ("", ""))[0]:
+            self._last[rid] = (ts, culture)
+
+    def sync(self) -> int:
+        if not self.csv_path.exists():
+            return 0
+        with self._lock:
+            st = self.csv_path.stat()
+            size, sig = st.st_size, csv_signature(st)
+            if sig == self._sig:
+                return 0
+            ino, mtime_ns, old_size = (self._sig or "::").split(":")
+            if self._sig and (ino != str(st.st_ino) or size < self._offset
+                              or (str(size) == old_size and mtime_ns != str(st.st_mtime_ns))):
+                self._reset()  # truncated/replaced
+            with open(self.csv_path, "rb") as f:
+                if not self._header:
+                    header_line = f.readline()
+                    self._header = next(csv.reader([header_line.decode("utf-8-sig")]), [])
+                    self._offset = max(self._offset, len(header_line))
+                f.seek(self._offset)
+                blob = f.read(size - self._offset)
+            records, cut = complete_records(blob)  # a row being written waits for the next sync
+            for rec in records:
+                self._apply(dict(zip(self._header, rec)))
+            self._offset += cut
+            self._sig = sig
+            return len(records)
+
+    def _view(self, rater_id: str, culture: str) -> RaterView:
+        """Caller holds self._lock."""
+        return self._views.get(((rater_id or "").strip(), (culture or "").strip()), RaterView())
+
+    def view(self, rater_id: str, culture: str) -> RaterView:
+        """Snapshot copy of one (rater_id, culture) view."""
+        self.sync()
+        with self._lock:
+            v = self._view(rater_id, culture)
+            return RaterView(list(v.rows), set(v.rated_ids), dict(v.latest))
+
+    def rows(self, *, rater_id: str | None = None, culture: str | None = None) -> List[Dict]:
+        self.sync()
+        with self._lock:
+            if rater_id is not None and culture is not None:
+                return list(self._view(rater_id, culture).rows)
+            rows = self._by_rater.get((rater_id or "").strip(), []) if rater_id is not None else self._all
+            if culture is not None:
+                return [r for r in rows if (r.get("culture", "") or "").strip() == (culture or "").strip()]
+            return list(rows)
+
+    def rated_session_ids(self, *, rater_id: str, culture: str) -> Set[str]:
+        self.sync()
+        with self._lock:
+            return set(self._view(rater_id, culture).rated_ids)
+
+    def latest_rows(self, *, rater_id: str, culture: str) -> Dict[str, Dict]:
+        self.sync()
+        with self._lock:
+            return dict(self._view(rater_id, culture).latest)
+
+    def last_culture(self, *, rater_id: str) -> str | None:
+        self.sync()
+        with self._lock:
+            return self._last.get((rater_id or "").strip(), ("", ""))[1] or None
+
+
+_STORE = AssessStore(ASSESS_DB, ASSESS_CSV, CSV_FIELDS)
+_VIEW = AssessView(ASSESS_CSV)
+
+
+def _store() -> AssessStore | AssessView | None:
+    """Query backend, or None when the CSV backend is selected / SQLite is unavailable."""
+    if ASSESS_BACKEND == "view":
+        _VIEW.sync()
+        return _VIEW
+    if ASSESS_BACKEND != "sqlite":
+        return None
+    try:
+        _STORE.sync()
+        return _STORE
+    except sqlite3.Error:
+        return None
+
+
 def _now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
@@ -43,13 +189,15 @@ def ensure_log_dir():
     LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _assess_log():
+    # never buffered: resume/progress read the row right after it is saved
+    return get_log(ASSESS_CSV, CSV_FIELDS, buffer_rows=0)
+
+
 def ensure_csv_header():
-    """Create CSV with header if missing."""
+    """Create CSV with header if missing (checked under the file lock)."""
     ensure_log_dir()
-    if not ASSESS_CSV.exists():
-        with open(ASSESS_CSV, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=CSV_FIELDS)
-            w.writeheader()
+    _assess_log().ensure_header()
 
 
 def append_assessment_row(row: Dict):
@@ -63,12 +211,10 @@ def append_assessment_row(row: Dict):
     if not safe_row["timestamp_utc"]:
         safe_row["timestamp_utc"] = _now_utc_iso()
 
-    with open(ASSESS_CSV, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=CSV_FIELDS)
-        w.writerow(safe_row)
+    _assess_log().append(safe_row)
 
 
-def read_assess_rows() -> List[Dict]:
+def _read_csv_rows() -> List[Dict]:
     if not ASSESS_CSV.exists():
         return []
     with open(ASSESS_CSV, "r", newline="", encoding="utf-8") as f:
@@ -76,6 +222,32 @@ def read_assess_rows() -> List[Dict]:
         return [dict(row) for row in r]
 
 
+def read_assess_rows(*, rater_id: str | None = None, culture: str | None = None) -> List[Dict]:
+    """All rows (append order), optionally narrowed to a rater and/or culture via the index."""
+    store = _store()
+    if store is not None:
+        return store.rows(rater_id=rater_id, culture=culture)
+
+    rows = _read_csv_rows()
+    if rater_id is not None:
+        rows = [r for r in rows if r.get("rater_id", "").strip() == (rater_id or "").strip()]
+    if culture is not None:
+        rows = [r for r in rows if r.get("culture", "").strip() == (culture or "").strip()]
+    return rows
+
+
+def export_assess_csv(out_path: Path, *, rater_id: str | None = None, culture: str | None = None) -> int:
+    """Write (a filtered view of) the assessment history to a standalone CSV."""
+    rows = read_assess_rows(rater_id=rater_id, culture=culture)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+    return len(rows)
+
+
 def filter_rows(rows: List[Dict], *, rater_id: str, culture: str) -> List[Dict]:
     rater_id = (rater_id or "").strip()
     culture = (culture or "").strip()
@@ -86,19 +258,35 @@ def filter_rows(rows: List[Dict], *, rater_id: str, culture: str) -> List[Dict]:
     return out
 
 
-def rated_session_ids(rows: List[Dict], *, rater_id: str, culture: str) -> Set[str]:
+# The query helpers below accept rows=None: then they answer from the indexed store
+# (or a filtered CSV read) instead of scanning a caller-provided list.
+def rated_session_ids(rows: List[Dict] | None = None, *, rater_id: str, culture: str) -> Set[str]:
     """
     If a session_id appears at least once for (rater_id, culture), it's considered completed for resume logic.
     """
+    if rows is None:
+        store = _store()
+        if store is not None:
+            return store.rated_session_ids(rater_id=rater_id, culture=culture)
+        rows = read_assess_rows(rater_id=rater_id, culture=culture)
     filtered = filter_rows(rows, rater_id=rater_id, culture=culture)
     return {str(r.get("session_id", "")).strip() for r in filtered if str(r.get("session_id", "")).strip()}
 
 
-def latest_rows_per_session(rows: List[Dict]) -> Dict[str, Dict]:
+def latest_rows_per_session(
+    rows: List[Dict] | None = None, *, rater_id: str | None = None, culture: str | None = None
+) -> Dict[str, Dict]:
     """
     Given rows already filtered to a single (rater_id, culture),
     return latest row per session_id by timestamp_utc.
+    With rows=None, rater_id/culture select the rows from the store.
     """
+    if rows is None:
+        store = _store()
+        if store is not None:
+            return store.latest_rows(rater_id=rater_id or "", culture=culture or "")
+        rows = read_assess_rows(rater_id=rater_id or "", culture=culture or "")
+
     latest: Dict[str, Dict] = {}
     for row in rows:
         sid = str(row.get("session_id", "")).strip()
@@ -114,16 +302,23 @@ def latest_rows_per_session(rows: List[Dict]) -> Dict[str, Dict]:
     return latest
 
 
-def compute_progress(total_sessions: int, rows: List[Dict], *, rater_id: str, culture: str) -> Tuple[int, int]:
+def compute_progress(
+    total_sessions: int, rows: List[Dict] | None = None, *, rater_id: str, culture: str
+) -> Tuple[int, int]:
     done = len(rated_session_ids(rows, rater_id=rater_id, culture=culture))
     return done, total_sessions
 
 
-def last_culture_for_rater(rows: List[Dict], *, rater_id: str) -> str | None:
+def last_culture_for_rater(rows: List[Dict] | None = None, *, rater_id: str) -> str | None:
     """Return the most recent culture used by this rater_id based on timestamp_utc."""
     rater_id = (rater_id or "").strip()
     if not rater_id:
         return None
+    if rows is None:
+        store = _store()
+        if store is not None:
+            return store.last_culture(rater_id=rater_id)
+        rows = read_assess_rows(rater_id=rater_id)
 
     latest_ts = ""
     latest_culture = None
@@ -1,7 +1,7 @@
 # core/metrics.py
 import json
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
 
 # 1) Turn-level labeling (LLM)
@@ -77,6 +77,94 @@ JSON:"""
     return labs
 
 
+# 1b) Fused supervisor mode: labels + micro feedback in ONE call
+SUPERVISOR_SYSTEM = """
+You are a counseling supervisor reviewing ONE counselor reply.
+First label it, then give very concise micro feedback that is consistent with your labels.
+
+Return STRICT JSON with exactly these fields:
+{
+  "labels": {
+    "empathy": 0|1, "reflection": 0|1, "validation": 0|1, "open_question": 0|1, "suggestion": 0|1,
+    "cultural_responsiveness": 0|1, "stereotype_risk": 0|1, "goal_alignment": 0|1,
+    "coherence": 0|1, "safety_response": 0|1
+  },
+  "feedback": {
+    "strength_title": "Empathy|Reflection|Validation|Open Question|Listening",
+    "strength_note": "one short sentence (<=18 words) praising the best thing",
+    "feedback_title": "Questions|Validation|Empathy|Refocus|Suggesting",
+    "feedback_note": "one short sentence (<=18 words) with a concrete improvement tip",
+    "alt_response": "optional 1-2 sentences better rewrite; neutral tone (may be empty)"
+  }
+}
+
+Flags:
+- empathy, reflection, validation, open_question, suggestion: core micro-skills
+- cultural_responsiveness: references identity/culture respectfully without stereotyping; culturally attuned
+- stereotype_risk: stereotyping, overgeneralization, or inappropriate cultural assumptions
+- goal_alignment: stays aligned with client's main concern / agenda
+- coherence: reply is coherent and grounded in prior turn (not random / not contradictory)
+- safety_response: if there is risk/self-harm content in context, does the reply respond safely (support, resources)
+
+Output JSON only.
+""".strip()
+
+FEEDBACK_FIELDS = ["strength_title", "strength_note", "feedback_title", "feedback_note", "alt_response"]
+
+
+def parse_supervisor_json(text: str) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    Strict parser for SUPERVISOR_SYSTEM output.
+    Raises ValueError unless every flag is 0/1 and every feedback field is a string
+    (only alt_response may be empty).
+    """
+    data = _clean_json_block(text)
+    labels, feedback = data.get("labels"), data.get("feedback")
+    if not isinstance(labels, dict) or not isinstance(feedback, dict):
+        raise ValueError("supervisor JSON must contain 'labels' and 'feedback' objects")
+
+    labs = {}
+    for k in DEFAULT_KEYS:
+        v = labels.get(k)
+        if isinstance(v, bool):
+            v = int(v)
+        if v not in (0, 1):
+            raise ValueError(f"label '{k}' must be 0/1, got {v!r}")
+        labs[k] = int(v)
+
+    micro = {}
+    for k in FEEDBACK_FIELDS:
+        v = feedback.get(k, "" if k == "alt_response" else None)
+        if not isinstance(v, str) or (k != "alt_response" and not v.strip()):
+            raise ValueError(f"feedback field '{k}' missing or empty")
+        micro[k] = v.strip()
+    return labs, micro
+
+
+def label_and_feedback_with_llm(
+    gcall, counselor_text: str, context: Dict[str, Any] | None = None
+) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    One request instead of label_turn_with_llm + micro feedback.
+    Returns (labels, micro_feedback); raises ValueError if the reply does not parse strictly,
+    so callers can fall back to the two-call path.
+    """
+    context = context or {}
+    client_prev = (context.get("client_prev") or "").strip()
+    prompt = f"""{SUPERVISOR_SYSTEM}
+
+Client previous message (optional):
+\"\"\"{client_prev}\"\"\"
+
+Counselor message:
+\"\"\"{(counselor_text or "").strip()}\"\"\"
+
+JSON:"""
+
+    out, _ = gcall(prompt, max_tokens=420, temperature=0.0)
+    return parse_supervisor_json(out)
+
+
 # 2) Session aggregation utilities
 DEFAULT_KEYS = [
     "empathy", "reflection", "validation", "open_question", "suggestion",
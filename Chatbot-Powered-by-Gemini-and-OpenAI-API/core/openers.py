@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+from .prompts import build_patient_system_prompt
+from .scenarios import SCENARIOS
+
+OPENER_TASK = "Task: Start the conversation in 1–2 sentences about how you're feeling."
+
+
+def opener_prompt(scenario: str) -> str:
+    return f"{build_patient_system_prompt(scenario)}\n{OPENER_TASK}"
+
+
+def _generate_with_gcall(scenario: str) -> str:
+    from .llm import gcall  # lazy: keeps this module importable without the SDK configured
+    # refills are prefetching: never compete with live replies for quota
+    text, _ = gcall(opener_prompt(scenario), max_tokens=140, temperature=0.7, priority="background")
+    return text
+
+
+class OpenerPool:
+    """
+    Process-wide pool of pre-generated opening patient messages, one queue per scenario.
+    - take(): pops one opener (each opener is used once) or returns None if the queue is empty
+    - a daemon thread refills a scenario back to `target` once it drops below `low_water`
+    """
+
+    def __init__(self, generate: Callable[[str], str] = _generate_with_gcall,
+                 target: int = 4, low_water: int = 2, retry_after_s: float = 30.0):
+        self.generate = generate
+        self.target = target
+        self.low_water = low_water
+        self.retry_after_s = retry_after_s
+        self._queues: Dict[str, Deque[str]] = {}
+        self._refilling: set = set()
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _refill(self, scenario: str):
+        try:
+            while True:
+                with self._lock:
+                    if len(self._queues[scenario]) >= self.target:
+                        return
+                text = (self.generate(scenario) or "").strip()
+                if not text:
+                    raise RuntimeError("empty opener")
+                with self._lock:
+                    self._queues[scenario].append(text)
+        except Exception:
+            with self._lock:
+                self._failed_at[scenario] = time.monotonic()
+        finally:
+            with self._lock:
+                self._refilling.discard(scenario)
+
+    def warm(self, scenario: str):
+        """Start a background refill if the queue is below the low-water mark."""
+        with self._lock:
+            q = self._queues.setdefault(scenario, deque())
+            if scenario in self._refilling or len(q) >= self.low_water:
+                return
+            if time.monotonic() - self._failed_at.get(scenario, -1e9) < self.retry_after_s:
+                return
+            self._refilling.add(scenario)
+        threading.Thread(target=self._refill, args=(scenario,), daemon=True).start()
+
+    def warm_all(self, scenarios: Iterable[str] = SCENARIOS):
+        for scn in scenarios:
+            self.warm(scn)
+
+    def take(self, scenario: str) -> Optional[str]:
+        with self._lock:
+            q = self._queues.setdefault(scenario, deque())
+            text = q.popleft() if q else None
+        self.warm(scenario)
+        return text
+
+    def sizes(self) -> Dict[str, int]:
+        with self._lock:
+            return {k: len(v) for k, v in self._queues.items()}
+
+
+# shared by every Streamlit session in this process
+OPENERS = OpenerPool()
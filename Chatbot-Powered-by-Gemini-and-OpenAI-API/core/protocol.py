@@ -0,0 +1,41 @@
+"""
+CARE Pre/Practice/Post protocol shared by the Streamlit app (care_gemini.py) and the
+headless simulator (core/simulate.py). No Streamlit imports.
+"""
+from typing import Dict, List
+
+from .metrics import compute_session_skill_rates
+from .prompts import build_patient_system_prompt
+
+PHASE_ORDER = ["Pre", "Practice", "Post"]
+PHASE_LIMITS = {"Pre": 6, "Practice": 10, "Post": 6}
+
+PHASE_SCENARIO = {
+    "Pre": "Alex (35, holiday loneliness)",
+    "Practice": "Veteran father (35, reunification barriers)",
+    "Post": "Jane (young adult, low mood & self-esteem, family issues)",
+}
+
+PATIENT_MAX_TOKENS = 200
+
+
+def patient_turn_prompt(scenario: str, prev_patient: str, counselor_text: str) -> str:
+    """Prompt for the patient's next message after a counselor reply."""
+    return (
+        f"{build_patient_system_prompt(scenario)}\n"
+        f"Context: Previous patient message: {prev_patient}\n"
+        f"Counselor replied: {counselor_text}\n\n"
+        "Task: Reply as the patient in 1–3 sentences, staying in character."
+    )
+
+
+def metrics_summary_from_labels(labels: List[Dict[str, int]]) -> Dict[str, float]:
+    """sessions.csv skill rates; {} = placeholder for a turn still being labeled."""
+    rates = compute_session_skill_rates([lab for lab in labels if lab]) or {}
+    return {
+        "Empathy": float(rates.get("empathy_rate", 0.0)),
+        "Reflection": float(rates.get("reflection_rate", 0.0)),
+        "Open Questions": float(rates.get("open_question_rate", 0.0)),
+        "Validation": float(rates.get("validation_rate", 0.0)),
+        "Suggestions": float(rates.get("suggestion_rate", 0.0)),
+    }
@@ -0,0 +1,116 @@
+"""
+Vectorized aggregation of session ratings (assess_sessions) for the Results page and exports.
+
+Build the typed frame once (ratings_frame), then every statistic is a NumPy/pandas
+reduction over the (rows x METRIC_FIELDS) matrix instead of per-cell Python loops.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .logs_assess import METRIC_FIELDS
+
+KEY_COLUMNS = ["timestamp_utc", "rater_id", "culture", "session_id"]
+SCALE = np.arange(1, 6)  # 1–5 ratings
+Z_95 = 1.959963984540054
+
+
+def ratings_frame(rows) -> pd.DataFrame:
+    """
+    rows: DataFrame (e.g. core.columnar.read_log_table) or list of dicts (CSV rows).
+    Returns KEY_COLUMNS as stripped strings + METRIC_FIELDS as float64 (NaN if missing/invalid).
+    """
+    df = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows or []))
+    for col in KEY_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+        df[col] = df[col].fillna("").astype(str).str.strip()
+    for m in METRIC_FIELDS:
+        if m not in df.columns:
+            df[m] = np.nan
+        df[m] = pd.to_numeric(df[m], errors="coerce").astype("float64")
+    return df
+
+
+def ratings_matrix(df: pd.DataFrame) -> np.ndarray:
+    """(n_rows, len(METRIC_FIELDS)) float matrix, NaN for missing."""
+    return df[METRIC_FIELDS].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def select(df: pd.DataFrame, *, rater_id: Optional[str] = None, culture: Optional[str] = None) -> pd.DataFrame:
+    """None = all raters / all cultures."""
+    mask = np.ones(len(df), dtype=bool)
+    if rater_id is not None:
+        mask &= (df["rater_id"] == rater_id.strip()).to_numpy()
+    if culture is not None:
+        mask &= (df["culture"] == culture.strip()).to_numpy()
+    return df[mask]
+
+
+def latest_only(df: pd.DataFrame) -> pd.DataFrame:
+    """Latest row per (rater_id, culture, session_id); the first-appended row wins timestamp ties."""
+    df = df[df["session_id"] != ""]
+    ordered = df.sort_values("timestamp_utc", ascending=False, kind="stable")
+    return ordered.drop_duplicates(["rater_id", "culture", "session_id"], keep="first").sort_index()
+
+
+def metric_stats(mat: np.ndarray) -> pd.DataFrame:
+    """n / mean / std (ddof=1) / 95% CI per metric column of `mat` (NaN-aware)."""
+    valid = ~np.isnan(mat)
+    n = valid.sum(axis=0)
+    total = np.where(valid, mat, 0.0).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n
+        sq = np.where(valid, (mat - mean) ** 2, 0.0).sum(axis=0)
+        std = np.sqrt(sq / (n - 1))
+        half = Z_95 * std / np.sqrt(n)
+    mean = np.where(n > 0, mean, np.nan)
+    std = np.where(n > 1, std, np.nan)
+    half = np.where(n > 1, half, np.nan)
+    return pd.DataFrame(
+        {"n": n, "mean": mean, "std": std, "ci95_low": mean - half, "ci95_high": mean + half},
+        index=pd.Index(METRIC_FIELDS, name="metric"),
+    )
+
+
+def histograms(mat: np.ndarray) -> pd.DataFrame:
+    """Counts of each scale value (1–5) per metric -> DataFrame indexed by score."""
+    counts = (mat[None, :, :] == SCALE[:, None, None]).sum(axis=1)
+    return pd.DataFrame(counts, index=pd.Index(SCALE, name="score"), columns=METRIC_FIELDS)
+
+
+def summarize(df: pd.DataFrame, *, latest: bool = True,
+              by: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Long-format summary: one row per (group..., metric) with n/mean/std/ci95.
+    by: grouping columns, e.g. ("culture",) or ("rater_id", "culture"); () = overall.
+    """
+    by = list(by)
+    data = latest_only(df) if latest else df
+    if not by:
+        return metric_stats(ratings_matrix(data)).reset_index()
+
+    frames = []
+    for key, grp in data.groupby(by, sort=True):
+        key = key if isinstance(key, tuple) else (key,)
+        stats = metric_stats(ratings_matrix(grp)).reset_index()
+        for col, val in zip(by, key):
+            stats.insert(0, col, val)
+        frames.append(stats)
+    if not frames:
+        return pd.DataFrame(columns=[*by, "metric", "n", "mean", "std", "ci95_low", "ci95_high"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def compare_latest_vs_all(df: pd.DataFrame) -> pd.DataFrame:
+    """Side-by-side means: latest rating per session vs full history."""
+    latest = metric_stats(ratings_matrix(latest_only(df)))
+    hist = metric_stats(ratings_matrix(df))
+    return pd.DataFrame({
+        "latest_n": latest["n"], "latest_mean": latest["mean"],
+        "all_n": hist["n"], "all_mean": hist["mean"],
+    })
+
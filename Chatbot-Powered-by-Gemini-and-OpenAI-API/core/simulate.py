@@ -0,0 +1,220 @@
+"""
+Headless CARE protocol runner: synthetic counselor agents go through Pre -> Practice -> Post
+against the patient simulator, with no Streamlit/session_state involved.
+
+Each simulated phase behaves like one app session (new session_id per phase) and writes
+the app's turns.csv / sessions.csv schema via core.logs (default: logs/sim/).
+LLM calls are blocking (core.llm.gcall), so they run in a thread pool sized to the
+concurrency limit while asyncio keeps at most `concurrency` sessions in flight.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logs import session_row, turn_label_columns, turn_row, write_row
+from .metrics import label_and_feedback_with_llm, label_turn_with_llm
+from .openers import opener_prompt
+from .prompts import build_history
+from .protocol import (
+    PHASE_LIMITS,
+    PHASE_ORDER,
+    PHASE_SCENARIO,
+    PATIENT_MAX_TOKENS,
+    metrics_summary_from_labels,
+    patient_turn_prompt,
+)
+
+COUNSELOR_STYLES = {
+    "novice": (
+        "You are a NOVICE counseling student. You mean well but often give advice too early, "
+        "ask closed or multiple questions, and sometimes miss the client's feelings."
+    ),
+    "developing": (
+        "You are a counseling student who is improving. You try to reflect feelings and ask open "
+        "questions, but occasionally slip into reassurance or suggestions."
+    ),
+    "skilled": (
+        "You are a SKILLED person-centered counselor. You reflect and validate feelings, ask one "
+        "open question at a time, and hold advice unless the client asks for it."
+    ),
+}
+
+PRACTICE_MODES = ["Practice + Feedback", "Practice only"]
+
+
+@dataclass
+class SimConfig:
+    n_sessions: int = 10               # simulated counselors, each runs the full protocol
+    concurrency: int = 8               # counselors in flight at once
+    styles: Tuple[str, ...] = tuple(COUNSELOR_STYLES)
+    practice_mode: str = "mixed"       # "Practice + Feedback" | "Practice only" | "mixed"
+    phases: Tuple[str, ...] = tuple(PHASE_ORDER)
+    log_dir: str = "logs/sim"
+    seed: int = 0
+    counselor_temperature: float = 0.8
+
+
+@dataclass
+class SimStats:
+    sessions: int = 0
+    failed: int = 0
+    turns: int = 0
+    llm_calls: int = 0
+    elapsed_s: float = 0.0
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+    def record(self, kind: str, seconds: float):
+        self.llm_calls += 1
+        self.latencies.setdefault(kind, []).append(seconds)
+
+    def summary(self) -> Dict:
+        def pct(xs, q):
+            xs = sorted(xs)
+            return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else None
+
+        return {
+            "sessions": self.sessions,
+            "failed": self.failed,
+            "turns": self.turns,
+            "llm_calls": self.llm_calls,
+            "elapsed_s": round(self.elapsed_s, 2),
+            "turns_per_s": round(self.turns / self.elapsed_s, 2) if self.elapsed_s else None,
+            "latency_s": {k: {"p50": pct(v, 0.5), "p95": pct(v, 0.95), "n": len(v)}
+                          for k, v in sorted(self.latencies.items())},
+            "errors": self.errors[:20],
+        }
+
+
+def counselor_prompt(style: str, scenario: str, patient_msgs: List[str], counselor_msgs: List[str],
+                     feedback_note: str = "") -> str:
+    tip = f"\nYour supervisor's last tip: {feedback_note}\n" if feedback_note else ""
+    return (
+        f"{COUNSELOR_STYLES[style]}\n"
+        f"You are talking with a client ({scenario}).\n"
+        f"{tip}\n"
+        f"Conversation so far:\n{build_history(patient_msgs, counselor_msgs)}\n\n"
+        "Task: Write your NEXT counselor reply in 1–3 sentences. Output only the reply."
+    )
+
+
+class Simulator:
+    def __init__(self, config: SimConfig, llm: Optional[Callable] = None):
+        if llm is None:
+            from .llm import gcall  # lazy: a custom llm needs no SDK
+            llm = partial(gcall, priority="background")
+        self.llm = llm
+        self.config = config
+        self.stats = SimStats()
+        self._rng = random.Random(config.seed)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # LLM helpers (blocking calls -> thread pool)
+    async def _call(self, kind: str, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        out = await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+        self.stats.record(kind, time.perf_counter() - t0)
+        return out
+
+    async def _text(self, kind: str, prompt: str, max_tokens: int, temperature: float) -> str:
+        text, _ = await self._call(kind, self.llm, prompt, max_tokens=max_tokens, temperature=temperature)
+        return (text or "").strip()
+
+    async def _label(self, text: str, prev_patient: str, want_feedback: bool) -> Tuple[Dict, Dict]:
+        ctx = {"client_prev": prev_patient}
+        if want_feedback:
+            try:
+                return await self._call("supervisor", label_and_feedback_with_llm, self.llm, text, ctx)
+            except ValueError:
+                pass  # malformed fused reply: labels only
+        labs = await self._call("label", label_turn_with_llm, self.llm, text, ctx)
+        return labs, {}
+
+    # Protocol
+    async def run_phase(self, style: str, mode: str, phase: str) -> Dict:
+        log_dir = self.config.log_dir
+        scenario = PHASE_SCENARIO[phase]
+        ss = {
+            "session_id": f"sim-{uuid.uuid4()}",
+            "scenario": scenario,
+            "phase": phase,
+            "mode": mode,
+            "patient_msgs": [],
+            "counselor_msgs": [],
+            "metrics_summary": {},
+            "session_metrics": {},
+        }
+        labels = []
+        feedback_note = ""
+        want_feedback = phase == "Practice"
+
+        ss["patient_msgs"].append(await self._text("opener", opener_prompt(scenario), 140, 0.7))
+        for _ in range(PHASE_LIMITS[phase]):
+            text = await self._text(
+                "counselor",
+                counselor_prompt(style, scenario, ss["patient_msgs"], ss["counselor_msgs"], feedback_note),
+                160, self.config.counselor_temperature,
+            )
+            prev_patient = ss["patient_msgs"][-1]
+            ss["counselor_msgs"].append(text)
+            row = turn_row(ss, text)
+
+            # patient reply and supervisor labeling in parallel, as in the app
+            nxt, (labs, micro) = await asyncio.gather(
+                self._text("patient", patient_turn_prompt(scenario, prev_patient, text), PATIENT_MAX_TOKENS, 0.7),
+                self._label(text, prev_patient, want_feedback),
+            )
+            ss["patient_msgs"].append(nxt)
+            labels.append(labs)
+            row.update(turn_label_columns(labs))
+            write_row("turns.csv", row, log_dir)
+            self.stats.turns += 1
+            if mode == "Practice + Feedback" and micro:
+                feedback_note = micro.get("feedback_note", "")
+
+        ss["metrics_summary"] = metrics_summary_from_labels(labels)
+        srow = session_row(ss)
+        write_row("sessions.csv", srow, log_dir)
+        return srow
+
+    async def run_counselor(self, sem: asyncio.Semaphore, style: str, mode: str) -> List[Dict]:
+        async with sem:
+            rows = []
+            try:
+                for phase in self.config.phases:
+                    rows.append(await self.run_phase(style, mode, phase))
+                self.stats.sessions += 1
+            except Exception as e:  # one failed counselor must not stop the batch
+                self.stats.failed += 1
+                self.stats.errors.append(f"{type(e).__name__}: {e}")
+            return rows
+
+    async def run(self) -> Dict:
+        cfg = self.config
+        sem = asyncio.Semaphore(cfg.concurrency)
+        # up to two blocking calls per session in flight (patient reply + labeling)
+        self._pool = ThreadPoolExecutor(max_workers=2 * cfg.concurrency, thread_name_prefix="care-sim")
+        jobs = []
+        for _ in range(cfg.n_sessions):
+            style = self._rng.choice(cfg.styles)
+            mode = self._rng.choice(PRACTICE_MODES) if cfg.practice_mode == "mixed" else cfg.practice_mode
+            jobs.append(self.run_counselor(sem, style, mode))
+        t0 = time.perf_counter()
+        try:
+            await asyncio.gather(*jobs)
+        finally:
+            self._pool.shutdown(wait=False)
+            self.stats.elapsed_s = time.perf_counter() - t0
+        return self.stats.summary()
+
+
+def run_simulation(config: SimConfig, llm: Optional[Callable] = None) -> Dict:
+    return asyncio.run(Simulator(config, llm).run())
@@ -0,0 +1,108 @@
+"""
+Pluggable token counters for length budgets (SFT history truncation, bucketing).
+
+Specs accepted by get_tokenizer():
+  "chars"              one token per character (the old max_chars behaviour)
+  "whitespace"         words / punctuation, one token per CJK character (offline)
+  "bytes"              UTF-8 bytes (offline, upper bound for byte-level BPE)
+  "hf:<name or path>"  Hugging Face tokenizer (needs `transformers`)
+  "tiktoken:<enc>"     tiktoken encoding, e.g. tiktoken:cl100k_base (needs `tiktoken`)
+
+Every tokenizer offers count(text) and tail(text, n): the shortest suffix of text
+holding its last n tokens.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+# Hiragana/Katakana, CJK ideographs (+ext A, compatibility), Hangul syllables
+_CJK = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_WS_TOKEN = re.compile(rf"[{_CJK}]|[^\W{_CJK}]+|[^\w\s]")
+
+
+class CharTokenizer:
+    name = "chars"
+
+    def count(self, text: str) -> int:
+        return len(text)
+
+    def tail(self, text: str, n: int) -> str:
+        return text[len(text) - n:] if n > 0 else ""
+
+
+class WhitespaceTokenizer:
+    name = "whitespace"
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in _WS_TOKEN.finditer(text))
+
+    def tail(self, text: str, n: int) -> str:
+        if n <= 0:
+            return ""
+        starts = [m.start() for m in _WS_TOKEN.finditer(text)]
+        return text if n >= len(starts) else text[starts[-n]:]
+
+
+class ByteTokenizer:
+    name = "bytes"
+
+    def count(self, text: str) -> int:
+        return len(text.encode("utf-8"))
+
+    def tail(self, text: str, n: int) -> str:
+        if n <= 0:
+            return ""
+        # a cut inside a multi-byte character drops that character
+        return text.encode("utf-8")[-n:].decode("utf-8", errors="ignore")
+
+
+class HFTokenizer:
+    def __init__(self, name_or_path: str):
+        from transformers import AutoTokenizer  # optional dependency
+
+        self.name = f"hf:{name_or_path}"
+        self._tok = AutoTokenizer.from_pretrained(name_or_path)
+
+    def count(self, text: str) -> int:
+        return len(self._tok.encode(text, add_special_tokens=False))
+
+    def tail(self, text: str, n: int) -> str:
+        if n <= 0:
+            return ""
+        ids = self._tok.encode(text, add_special_tokens=False)
+        return text if n >= len(ids) else self._tok.decode(ids[-n:])
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding: str):
+        import tiktoken  # optional dependency
+
+        self.name = f"tiktoken:{encoding}"
+        self._enc = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._enc.encode(text, disallowed_special=()))
+
+    def tail(self, text: str, n: int) -> str:
+        if n <= 0:
+            return ""
+        ids = self._enc.encode(text, disallowed_special=())
+        return text if n >= len(ids) else self._enc.decode(ids[-n:])
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(spec: str = "chars"):
+    """One instance per spec and process (cheap to call from pool workers)."""
+    kind, _, arg = (spec or "chars").partition(":")
+    if kind == "chars":
+        return CharTokenizer()
+    if kind == "whitespace":
+        return WhitespaceTokenizer()
+    if kind == "bytes":
+        return ByteTokenizer()
+    if kind == "hf" and arg:
+        return HFTokenizer(arg)
+    if kind == "tiktoken" and arg:
+        return TiktokenTokenizer(arg)
+    raise ValueError(f"Unknown tokenizer spec: {spec!r}")
@@ -1,14 +1,20 @@
+import re
+
 import streamlit as st
 
 LEHIGH_DOMAIN = "@lehigh.edu"
+# plain email local-part characters; keeps reserved ids such as "llm:baseline" unreachable
+_LOCAL_PART = re.compile(r"[a-z0-9._+-]+")
 
 
 def lehigh_email_valid(email: str) -> bool:
-    """Only require @lehigh.edu (no strict id format)."""
+    """@lehigh.edu with an ordinary local part (no strict id format)."""
     if not email:
         return False
     email = email.strip().lower()
-    return email.endswith(LEHIGH_DOMAIN) and len(email) > len(LEHIGH_DOMAIN)
+    if not email.endswith(LEHIGH_DOMAIN):
+        return False
+    return bool(_LOCAL_PART.fullmatch(email[: -len(LEHIGH_DOMAIN)]))
 
 
 def render_signin_gate() -> bool:
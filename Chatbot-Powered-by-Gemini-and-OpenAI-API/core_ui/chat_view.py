@@ -1,5 +1,14 @@
+from __future__ import annotations
+
+import html
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
 import streamlit as st
 
+from core_ui.dataset_index import chunk_bounds, file_fingerprint
+
 # CULTURE_BADGES = {
 #     "Chinese": "🀄",
 #     "Hispanic": "🪇",
@@ -8,77 +17,177 @@ import streamlit as st
 # }
 
 
-def _inject_chat_css():
-    st.markdown(
-        """
-        <style>
-        .chat-wrap { display: flex; flex-direction: column; gap: 10px; }
-
-        .msg-row { display: flex; width: 100%; }
-        .msg-row.left  { justify-content: flex-start; }
-        .msg-row.right { justify-content: flex-end; }
-
-        .bubble {
-            max-width: min(750px, 75%);
-            padding: 10px 12px;
-            border-radius: 16px;
-            line-height: 1.35;
-            border: 1px solid rgba(255,255,255,0.10);
-            background: rgba(255,255,255,0.06);
-            word-wrap: break-word;
-            white-space: pre-wrap;
-        }
-
-        .bubble.left  { border-top-left-radius: 8px; }
-        .bubble.right { border-top-right-radius: 8px; }
-
-        .meta {
-            font-size: 12px;
-            opacity: 0.70;
-            margin-bottom: 4px;
-            display:flex;
-            gap:6px;
-            align-items:center;
-        }
-        .meta .tag {
-            font-weight: 700;
-            opacity: 0.85;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
+CHAT_CSS = """
+<style>
+.chat-wrap { display: flex; flex-direction: column; gap: 10px; }
+
+.msg-row { display: flex; width: 100%; }
+.msg-row.left  { justify-content: flex-start; }
+.msg-row.right { justify-content: flex-end; }
+
+.bubble {
+    max-width: min(750px, 75%);
+    padding: 10px 12px;
+    border-radius: 16px;
+    line-height: 1.35;
+    border: 1px solid rgba(255,255,255,0.10);
+    background: rgba(255,255,255,0.06);
+    word-wrap: break-word;
+    white-space: pre-wrap;
+}
+
+.bubble.left  { border-top-left-radius: 8px; }
+.bubble.right { border-top-right-radius: 8px; }
+
+.meta {
+    font-size: 12px;
+    opacity: 0.70;
+    margin-bottom: 4px;
+    display:flex;
+    gap:6px;
+    align-items:center;
+}
+.meta .tag {
+    font-weight: 700;
+    opacity: 0.85;
+}
+</style>
+"""
+
+# windowed mode: turns per chunk shown/expanded at a time
+CHAT_WINDOW_TURNS = 40
+
+# rendered conversation HTML per (dataset file, fingerprint, session_id, turn range); sessions are read-only
+_HTML_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+_HTML_CACHE_SIZE = 64
+_HTML_LOCK = threading.Lock()
+
+
+def inject_chat_css():
+    """Call once per page run, before any render_chat."""
+    st.markdown(CHAT_CSS, unsafe_allow_html=True)
+
+
+def _bubble(t) -> str:
+    speaker = (t.get("speaker") or "").lower()
+    if speaker == "client":
+        who, side = "Client", "left"
+    else:
+        who, side = "🧑‍⚕️ Counselor", "right"
+    # escaped, and no raw newlines: a blank line would end the markdown HTML block
+    text = html.escape(t.get("text") or "").replace("\r\n", "\n").replace("\n", "<br>")
+    return (
+        f'<div class="msg-row {side}"><div class="bubble {side}">'
+        f'<div class="meta"><span class="tag">{who}</span></div>{text}'
+        "</div></div>"
     )
 
 
-def render_chat(turns, culture: str = "Others"):
-    _inject_chat_css()
-    # badge = CULTURE_BADGES.get(culture, "🌍")
+def chat_html(turns) -> str:
+    """The whole conversation as one HTML block (one st.markdown delta instead of one per turn)."""
+    return '<div class="chat-wrap">' + "".join(_bubble(t) for t in turns) + "</div>"
+
 
-    st.markdown('<div class="chat-wrap">', unsafe_allow_html=True)
-
-    for t in turns:
-        speaker = (t.get("speaker") or "").lower()
-        text = t.get("text") or ""
-
-        if speaker == "client":
-            who = 'Client'
-            row_cls = "left"
-            bubble_cls = "left"
-        else:
-            who = "🧑‍⚕️ Counselor"
-            row_cls = "right"
-            bubble_cls = "right"
-
-        st.markdown(
-            f"""
-            <div class="msg-row {row_cls}">
-              <div class="bubble {bubble_cls}">
-                <div class="meta"><span class="tag">{who}</span></div>
-                {text}
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
+def _cached_chat_html(source: Path, session_id: str, turns, start: int = 0, end: int | None = None) -> str:
+    end = len(turns) if end is None else end
+    source = Path(source).resolve()
+    key = (source, file_fingerprint(source), session_id, start, end)
+    with _HTML_LOCK:
+        hit = _HTML_CACHE.get(key)
+        if hit is not None:
+            _HTML_CACHE.move_to_end(key)
+            return hit
+    body = chat_html(turns[start:end])
+    with _HTML_LOCK:
+        _HTML_CACHE[key] = body
+        while len(_HTML_CACHE) > _HTML_CACHE_SIZE:
+            _HTML_CACHE.popitem(last=False)
+    return body
+
+
+def _turn_range_label(start: int, end: int) -> str:
+    return f"Turns {start + 1}–{end}"
+
+
+def _render_windowed(turns, chunks, source, session_id):
+    """Show chunks[first..last] only; buttons expand the range, the selectbox jumps to a chunk."""
+    state_key = f"_chat_window_{source}_{session_id}"
+    first, last = st.session_state.get(state_key, (0, 0))
+    first, last = max(0, min(first, len(chunks) - 1)), max(0, min(last, len(chunks) - 1))
+
+    jump_key = f"{state_key}_jump"
+    if jump_key not in st.session_state:
+        st.session_state[jump_key] = first
+
+    def _set(lo, hi):
+        st.session_state[state_key] = (lo, hi)
+        st.session_state[jump_key] = lo
+
+    def _jump():
+        k = st.session_state[jump_key]
+        _set(k, k)
+
+    labels = [_turn_range_label(s, e) for s, e in chunks]
+    top = st.columns([2, 3])
+    with top[0]:
+        st.selectbox(
+            "Jump to",
+            range(len(chunks)),
+            format_func=lambda k: labels[k],
+            key=jump_key,
+            on_change=_jump,
+            label_visibility="collapsed",
         )
+    with top[1]:
+        st.caption(f"Showing turns {chunks[first][0] + 1}–{chunks[last][1]} of {chunks[-1][1]}")
+
+    if first > 0:
+        st.button("▲ Show earlier turns", key=f"{state_key}_prev", on_click=_set, args=(first - 1, last))
+
+    if source is not None:
+        parts = [_cached_chat_html(source, session_id, turns, s, e) for s, e in chunks[first:last + 1]]
+    else:
+        parts = [chat_html(turns[s:e]) for s, e in chunks[first:last + 1]]
+    st.markdown("".join(parts), unsafe_allow_html=True)
+
+    if last < len(chunks) - 1:
+        nxt = chunks[last + 1]
+        bottom = st.columns([1, 1, 2])
+        with bottom[0]:
+            st.button(
+                f"▼ Show next {nxt[1] - nxt[0]} turns",
+                key=f"{state_key}_next",
+                on_click=_set,
+                args=(first, last + 1),
+                use_container_width=True,
+            )
+        with bottom[1]:
+            st.button(
+                "Show all",
+                key=f"{state_key}_all",
+                on_click=_set,
+                args=(0, len(chunks) - 1),
+                use_container_width=True,
+            )
+
+
+def render_chat(turns, culture: str = "Others", *, source: Path | None = None,
+                session_id: str | None = None, window: int | None = None, chunks=None):
+    """
+    Render a conversation as left/right bubbles. Expects inject_chat_css() earlier on the page.
+    source/session_id: dataset file + session id to reuse the rendered HTML across reruns.
+    window: windowed mode for long sessions, showing `window` turns at a time.
+    chunks: [(start, end), ...] turn ranges (e.g. LazySessions.turn_chunks); default from len(turns).
+    """
+    # badge = CULTURE_BADGES.get(culture, "🌍")
+    if window is not None:
+        chunks = chunks or chunk_bounds(len(turns), window)
+        if len(chunks) > 1:
+            _render_windowed(turns, chunks, source, session_id)
+            return
 
-    st.markdown("</div>", unsafe_allow_html=True)
+    if source is not None and session_id is not None:
+        body = _cached_chat_html(source, session_id, turns)
+    else:
+        body = chat_html(turns)
+    st.markdown(body, unsafe_allow_html=True)
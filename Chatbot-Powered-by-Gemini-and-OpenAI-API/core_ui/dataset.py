@@ -1,7 +1,13 @@
-import json
+import threading
 from pathlib import Path
 import streamlit as st
 
+from core_ui.dataset_index import (
+    LazySessions,
+    file_fingerprint,
+    load_index,
+)
+
 ROOT = Path(__file__).resolve().parents[1]
 
 DATASET_FILES = {
@@ -12,54 +18,31 @@ DATASET_FILES = {
 }
 
 
-def load_jsonl(path: Path):
-    if not path or not Path(path).exists():
-        st.error(f"Dataset file not found: {path}")
-        st.stop()
+# Process-level, read-only cache shared by all user sessions.
+# key: resolved path -> ((mtime_ns, size), LazySessions); a changed file is re-indexed once.
+_SESSIONS_CACHE = {}
+_SESSIONS_LOCK = threading.Lock()
 
-    rows = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            rows.append(json.loads(line))
-    return rows
 
-def parse_session_psydial(raw: dict):
+def load_sessions_cached(path: Path):
     """
-    Confirmed schema from student_only_100.jsonl:
-    {
-      "session_id": int,
-      "turns": [{"role": "system|user|assistant", "text": "..."} ...]
-    }
-
-    Normalize to:
-    {
-      "session_id": str,
-      "turns": [{"speaker": "client|counselor", "text": "..."} ...]
-    }
+    Index-backed sessions for a dataset file, shared across the process.
+    len()/session_ids/turn_counts come from the byte-offset index; sessions[i] parses
+    one session on demand. Callers must treat the session dicts as read-only.
     """
-    sid = str(raw.get("session_id", raw.get("id", "unknown")))
-    turns = raw.get("turns", [])
-    norm = []
+    path = Path(path).resolve()
+    fp = file_fingerprint(path)
+    hit = _SESSIONS_CACHE.get(path)
+    if hit and hit[0] == fp:
+        return hit[1]
 
-    for t in turns:
-        role = (t.get("role") or "").lower().strip()
-        text = t.get("text") or ""
-        if not text:
-            continue
-
-        # system turns are often long prompts; hide them in UI
-        if role == "system":
-            continue
-        if role in ["user", "client", "patient", "seeker", "human"]:
-            norm.append({"speaker": "client", "text": text})
-        else:
-            # assistant/therapist/counselor
-            norm.append({"speaker": "counselor", "text": text})
-
-    return {"session_id": sid, "turns": norm}
+    with _SESSIONS_LOCK:
+        hit = _SESSIONS_CACHE.get(path)
+        if hit and hit[0] == fp:
+            return hit[1]
+        sessions = LazySessions(path, load_index(path))  # empty sessions excluded by the index
+        _SESSIONS_CACHE[path] = (fp, sessions)
+        return sessions
 
 
 def get_sessions_for_culture(culture: str):
@@ -67,10 +50,11 @@ def get_sessions_for_culture(culture: str):
     if not path:
         st.error("This dataset is not configured yet.")
         st.stop()
+    if not Path(path).exists():
+        st.error(f"Dataset file not found: {path}")
+        st.stop()
 
-    raw_rows = load_jsonl(path)
-    sessions = [parse_session_psydial(r) for r in raw_rows]
-    sessions = [s for s in sessions if s.get("turns")]  # empty guard
+    sessions = load_sessions_cached(path)
 
     if not sessions:
         st.error("No sessions found in the dataset.")
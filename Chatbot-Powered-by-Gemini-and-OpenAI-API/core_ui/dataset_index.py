@@ -0,0 +1,205 @@
+"""
+Byte-offset index + lazy session access for large JSONL datasets.
+
+Sidecar file: <dataset>.idx.json next to the dataset, e.g.
+  student_only_100.jsonl.idx.json
+  {
+    "version": 1,
+    "fingerprint": [mtime_ns, size],
+    "entries": [{"session_id": "412", "line": 0, "offset": 0, "length": 10423,
+                 "n_turns": 37, "n_raw_turns": 38}, ...]
+  }
+
+No Streamlit imports here, so tools/ scripts can use it too.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx.json"
+
+
+def parse_session_psydial(raw: dict):
+    """
+    Confirmed schema from student_only_100.jsonl:
+    {
+      "session_id": int,
+      "turns": [{"role": "system|user|assistant", "text": "..."} ...]
+    }
+
+    Normalize to:
+    {
+      "session_id": str,
+      "turns": [{"speaker": "client|counselor", "text": "..."} ...]
+    }
+    """
+    sid = str(raw.get("session_id", raw.get("id", "unknown")))
+    turns = raw.get("turns", [])
+    norm = []
+
+    for t in turns:
+        role = (t.get("role") or "").lower().strip()
+        text = t.get("text") or ""
+        if not text:
+            continue
+
+        # system turns are often long prompts; hide them in UI
+        if role == "system":
+            continue
+        if role in ["user", "client", "patient", "seeker", "human"]:
+            norm.append({"speaker": "client", "text": text})
+        else:
+            # assistant/therapist/counselor
+            norm.append({"speaker": "counselor", "text": text})
+
+    return {"session_id": sid, "turns": norm}
+
+
+def file_fingerprint(path: Path) -> Tuple[int, int]:
+    stat = Path(path).stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def chunk_bounds(n_turns: int, size: int) -> List[Tuple[int, int]]:
+    """[(start, end), ...] half-open turn ranges of at most `size` turns."""
+    size = max(1, int(size))
+    return [(s, min(s + size, n_turns)) for s in range(0, n_turns, size)]
+
+
+def index_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def build_index(path: Path) -> List[Dict]:
+    """One sequential pass: byte offset/length of every non-empty line + turn counts."""
+    entries = []
+    offset = 0
+    with open(path, "rb") as f:
+        for line_no, line in enumerate(f):
+            length = len(line)
+            stripped = line.strip()
+            if stripped:
+                raw = json.loads(stripped)
+                norm = parse_session_psydial(raw)
+                entries.append({
+                    "session_id": norm["session_id"],
+                    "line": line_no,
+                    "offset": offset,
+                    "length": length,
+                    "n_turns": len(norm["turns"]),
+                    "n_raw_turns": len(raw.get("turns", []) or []),
+                })
+            offset += length
+    return entries
+
+
+def load_index(path: Path, write_sidecar: bool = True) -> List[Dict]:
+    """Read the sidecar if its fingerprint matches the dataset; otherwise rebuild (and try to save)."""
+    path = Path(path)
+    fp = list(file_fingerprint(path))
+    side = index_path(path)
+    try:
+        data = json.loads(side.read_text(encoding="utf-8"))
+        if data.get("version") == INDEX_VERSION and data.get("fingerprint") == fp:
+            return data["entries"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    entries = build_index(path)
+    if write_sidecar:
+        try:
+            tmp = side.with_name(side.name + ".tmp")
+            tmp.write_text(
+                json.dumps({"version": INDEX_VERSION, "fingerprint": fp, "entries": entries}),
+                encoding="utf-8",
+            )
+            tmp.replace(side)
+        except OSError:
+            pass  # read-only deploy: keep the index in memory only
+    return entries
+
+
+class LazySessions(Sequence):
+    """
+    Read-only sequence of normalized sessions backed by a memory-mapped JSONL file.
+    len(), session_ids and turn_counts come from the index; a session is parsed
+    only when it is indexed (small LRU of parsed sessions).
+    Sessions without dialog turns are excluded (same guard as the eager loader).
+    """
+
+    def __init__(self, path: Path, entries: List[Dict] | None = None, lru_size: int = 16):
+        self.path = Path(path)
+        entries = load_index(self.path) if entries is None else entries
+        self.entries = [e for e in entries if e.get("n_turns", 0) > 0]
+        self._lru: "OrderedDict[int, Dict]" = OrderedDict()
+        self._lru_size = lru_size
+        self._lock = threading.Lock()
+        self._mm = None
+
+    def _map(self):
+        if self._mm is None:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def raw(self, i: int) -> Dict:
+        """Raw JSON row (original roles, incl. system turns) for position i."""
+        e = self.entries[i]
+        with self._lock:
+            blob = self._map()[e["offset"]:e["offset"] + e["length"]]
+        return json.loads(blob)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        with self._lock:
+            hit = self._lru.get(i)
+            if hit is not None:
+                self._lru.move_to_end(i)
+                return hit
+        sess = parse_session_psydial(self.raw(i))
+        with self._lock:
+            self._lru[i] = sess
+            while len(self._lru) > self._lru_size:
+                self._lru.popitem(last=False)
+        return sess
+
+    @property
+    def session_ids(self) -> List[str]:
+        return [e["session_id"] for e in self.entries]
+
+    @property
+    def turn_counts(self) -> List[int]:
+        return [e["n_turns"] for e in self.entries]
+
+    def turn_chunks(self, i: int, size: int) -> List[Tuple[int, int]]:
+        """Chunk boundaries for session i, from the index (no parsing)."""
+        return chunk_bounds(self.entries[i]["n_turns"], size)
+
+    @property
+    def total_turns(self) -> int:
+        return sum(self.turn_counts)
+
+
+def iter_raw_sessions(path: Path) -> Iterator[Dict]:
+    """Streaming read of raw rows (no index, constant memory)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,194 @@
+"""
+Turn-level QC for raw dataset sessions + a precomputed QC index per dataset file.
+
+Sidecar file: <dataset>.qc.json next to the dataset, e.g.
+  student_only_100.jsonl.qc.json
+  {
+    "version": 2,
+    "fingerprint": [mtime_ns, size],
+    "min_turns": 6,
+    "eligible": [0, 2, 3, ...],
+    "entries": [{"session_id": "412", "n_raw_turns": 38, "n_turns": 37, "removed_dupes": 1,
+                 "n_alternation_issues": 0, "role_counts": {...}}, ...]
+  }
+
+Entry positions follow the non-empty lines of the file (same order as dataset_index).
+Only counts are stored; a session's turns are read via the byte-offset index and cleaned on demand.
+No Streamlit imports here, so tools/ scripts can use it too.
+"""
+from __future__ import annotations
+
+import json
+import random
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core_ui.dataset_index import file_fingerprint, iter_raw_sessions, load_index
+
+QC_VERSION = 2
+QC_SUFFIX = ".qc.json"
+MIN_GOOD_TURNS = 6
+
+
+def _normalize_role(role: str) -> str:
+    r = (role or "").strip().lower()
+    if r in {"user", "patient", "client", "seeker"}:
+        return "user"
+    if r in {"assistant", "counselor", "therapist"}:
+        return "assistant"
+    if r == "system":
+        return "system"
+    return "system"  # 안전하게 system으로
+
+def qc_clean_turns(turns: list[dict], remove_consecutive_dupes=True):
+    """
+    returns:
+      cleaned_turns: [{"role": "user|assistant|system", "text": "..."}]
+      qc: {removed_dupes:int, alternation_issues:[...], role_counts:{...}}
+    """
+    cleaned = []
+    removed_dupes = 0
+    prev_key = None
+
+    # 1) normalize + trim + consecutive dedupe
+    for t in (turns or []):
+        role = _normalize_role(t.get("role"))
+        text = (t.get("text") or "").strip()
+        if not text:
+            continue
+        key = (role, text)
+        if remove_consecutive_dupes and prev_key == key:
+            removed_dupes += 1
+            continue
+        prev_key = key
+        cleaned.append({"role": role, "text": text})
+
+    # 2) alternation check (ignoring system)
+    non_system = [t for t in cleaned if t["role"] in {"user", "assistant"}]
+    issues = []
+    for i in range(1, len(non_system)):
+        if non_system[i]["role"] == non_system[i-1]["role"]:
+            issues.append({
+                "idx_in_nonsys": i,
+                "role": non_system[i]["role"],
+                "prev_text": non_system[i-1]["text"][:80],
+                "curr_text": non_system[i]["text"][:80],
+            })
+
+    # counts
+    counts = {"user": 0, "assistant": 0, "system": 0}
+    for t in cleaned:
+        counts[t["role"]] = counts.get(t["role"], 0) + 1
+
+    qc = {"removed_dupes": removed_dupes, "alternation_issues": issues, "role_counts": counts}
+    return cleaned, qc
+
+
+def is_good_session(cleaned: list[dict], qc: dict, min_turns: int = MIN_GOOD_TURNS) -> bool:
+    """Practice-quality session: strict user/assistant alternation and enough turns."""
+    return not qc["alternation_issues"] and len(cleaned) >= min_turns
+
+
+def qc_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + QC_SUFFIX)
+
+
+def build_qc(path: Path, min_turns: int = MIN_GOOD_TURNS) -> Dict:
+    """One streaming pass over the dataset: QC counts per session, eligible positions."""
+    entries, eligible = [], []
+    for i, raw in enumerate(iter_raw_sessions(path)):
+        raw_turns = raw.get("turns", []) or []
+        cleaned, qc = qc_clean_turns(raw_turns, remove_consecutive_dupes=True)
+        entries.append({
+            "session_id": str(raw.get("session_id", raw.get("id", "unknown"))),
+            "n_raw_turns": len(raw_turns),
+            "n_turns": len(cleaned),
+            "removed_dupes": qc["removed_dupes"],
+            "n_alternation_issues": len(qc["alternation_issues"]),
+            "role_counts": qc["role_counts"],
+        })
+        if is_good_session(cleaned, qc, min_turns):
+            eligible.append(i)
+    return {"min_turns": min_turns, "eligible": eligible, "entries": entries}
+
+
+def load_qc(path: Path, write_sidecar: bool = True) -> Dict:
+    """Read the sidecar if its fingerprint matches the dataset; otherwise rebuild (and try to save)."""
+    path = Path(path)
+    fp = list(file_fingerprint(path))
+    side = qc_path(path)
+    try:
+        data = json.loads(side.read_text(encoding="utf-8"))
+        if (data.get("version") == QC_VERSION and data.get("fingerprint") == fp
+                and data.get("min_turns") == MIN_GOOD_TURNS):
+            return data
+    except (OSError, ValueError):
+        pass
+
+    data = {"version": QC_VERSION, "fingerprint": fp, **build_qc(path)}
+    if write_sidecar:
+        try:
+            tmp = side.with_name(side.name + ".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(side)
+        except OSError:
+            pass  # read-only deploy: keep the QC index in memory only
+    return data
+
+
+class QCIndex:
+    """Precomputed QC for one dataset file; sampling a good session is a single random pick."""
+
+    def __init__(self, path: Path, data: Dict):
+        self.path = Path(path)
+        self.fingerprint = tuple(data["fingerprint"])
+        self.entries: List[Dict] = data["entries"]
+        self.eligible: List[int] = data["eligible"]
+        self._offsets = load_index(self.path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def entry(self, i: int) -> Dict:
+        return self.entries[i]
+
+    def sample(self, rng: random.Random = random) -> Optional[int]:
+        """Position of a random eligible session (any session if none qualifies; None if empty)."""
+        if self.eligible:
+            return rng.choice(self.eligible)
+        return rng.randrange(len(self.entries)) if self.entries else None
+
+    def raw_turns(self, i: int) -> list[dict]:
+        """Original turns of session i, read from its byte range."""
+        e = self._offsets[i]
+        with open(self.path, "rb") as f:
+            f.seek(e["offset"])
+            raw = json.loads(f.read(e["length"]))
+        return raw.get("turns", []) or []
+
+    def turns(self, i: int, remove_consecutive_dupes: bool = True):
+        """(cleaned_turns, qc) of session i, as qc_clean_turns returns them."""
+        return qc_clean_turns(self.raw_turns(i), remove_consecutive_dupes=remove_consecutive_dupes)
+
+
+# Process-level cache, same policy as core_ui.dataset.load_sessions_cached
+_QC_CACHE: Dict[Path, QCIndex] = {}
+_QC_LOCK = threading.Lock()
+
+
+def load_qc_index(path: Path) -> QCIndex:
+    path = Path(path).resolve()
+    fp = file_fingerprint(path)
+    hit = _QC_CACHE.get(path)
+    if hit and hit.fingerprint == fp:
+        return hit
+
+    with _QC_LOCK:
+        hit = _QC_CACHE.get(path)
+        if hit and hit.fingerprint == fp:
+            return hit
+        idx = QCIndex(path, load_qc(path))
+        _QC_CACHE[path] = idx
+        return idx
@@ -22,12 +22,11 @@ openai.api_key = OPENAI_API_KEY
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
-# Function to get a response from OpenAI's API
-def get_openai_response(user_input, chat_history):
+# Function to stream a response from OpenAI's API (yields text deltas)
+def stream_openai_response(chat_history):
     messages = [{"role": "system", "content": "You are a helpful assistant."}]
     for entry in chat_history:
         messages.append({"role": entry["role"], "content": entry["content"]})
-    messages.append({"role": "user", "content": user_input})
 
     response = openai.ChatCompletion.create(
         model="gpt-4o",  # Correct model name
@@ -36,10 +35,15 @@ def get_openai_response(user_input, chat_history):
         max_tokens=4095,
         top_p=1,
         frequency_penalty=0,
-        presence_penalty=0
+        presence_penalty=0,
+        stream=True,
     )
 
-    return response.choices[0].message["content"]
+    for chunk in response:
+        delta = chunk.choices[0].get("delta", {})
+        piece = delta.get("content")
+        if piece:
+            yield piece
 
 # Display the chatbot's title on the page
 st.title("💭💭ChatBot - openAI")
@@ -56,10 +60,7 @@ if user_prompt:
     st.session_state.chat_history.append({"role": "user", "content": user_prompt})
     st.chat_message("user").markdown(user_prompt)
 
-    # Send user's message to OpenAI and get the response
-    openai_response = get_openai_response(user_prompt, st.session_state.chat_history)
-
-    # Display OpenAI's response
-    st.session_state.chat_history.append({"role": "assistant", "content": openai_response})
+    # Stream OpenAI's response token by token, then keep the final text in history
     with st.chat_message("assistant"):
-        st.markdown(openai_response)
+        openai_response = st.write_stream(stream_openai_response(st.session_state.chat_history))
+    st.session_state.chat_history.append({"role": "assistant", "content": openai_response})
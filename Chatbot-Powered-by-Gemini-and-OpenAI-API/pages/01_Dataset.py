@@ -77,17 +77,14 @@ def main():
         st.warning("Rater ID is missing. Please sign in again.")
         st.switch_page("Home.py")
 
-    # Load rows
-    rows = read_assess_rows()  # list[dict]
-
-    # 내 row만 필터
-    rows_me = [r for r in rows if (r.get("rater_id", "").strip() == rater_id)]
+    # 내 row만 로드 (indexed store: rater_id 기준 조회)
+    rows_me = read_assess_rows(rater_id=rater_id)  # list[dict]
 
     # lock 결정
     # 1) session_state에 lock 있으면 그걸 사용
     # 2) 없으면 rows_me에서 마지막 culture 추론해서 lock으로 설정
     if not st.session_state.get("selected_culture_lock"):
-        inferred = last_culture_for_rater(rows, rater_id=rater_id)
+        inferred = last_culture_for_rater(rows_me, rater_id=rater_id)
         if inferred:
             st.session_state["selected_culture_lock"] = inferred
 
@@ -132,7 +129,7 @@ def main():
             sessions = get_sessions_for_culture(culture)
             total = len(sessions)
 
-            done, _ = compute_progress(total, rows, rater_id=rater_id, culture=culture)
+            done, _ = compute_progress(total, rows_me, rater_id=rater_id, culture=culture)
             frac = 0 if total == 0 else (done / total)
 
             if not is_first_time:
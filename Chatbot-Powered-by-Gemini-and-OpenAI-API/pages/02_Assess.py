@@ -3,11 +3,10 @@ import streamlit as st
 from core_ui.layout import set_base_page_config, inject_base_css, render_top_right_signout
 from core_ui.auth import require_signed_in
 from core_ui.dataset import get_sessions_for_culture, DATASET_FILES
-from core_ui.chat_view import render_chat
+from core_ui.chat_view import inject_chat_css, render_chat, CHAT_WINDOW_TURNS
 
 from core.logs_assess import (
     append_assessment_row,
-    read_assess_rows,
     rated_session_ids,
     compute_progress,
     latest_rows_per_session,
@@ -16,6 +15,7 @@ from core.logs_assess import (
 
 set_base_page_config()
 inject_base_css()
+inject_chat_css()
 
 
 def scroll_to_top():
@@ -36,28 +36,21 @@ def scroll_to_top():
 
 
 def _get_sessions(culture: str):
-    # 1) session_state cache 우선 사용
-    cached = st.session_state.get("_sessions_cache")
-    if cached and isinstance(cached, list) and len(cached) > 0:
-        return cached
-
-    # 2) 없으면 로드하고 cache 저장
-    sessions = get_sessions_for_culture(culture)  # core_ui.dataset에서 불러오는 함수
-    st.session_state["_sessions_cache"] = sessions
-    return sessions
+    # process-level cache in core_ui.dataset (shared by all raters, invalidated by file mtime/size)
+    return get_sessions_for_culture(culture)
 
 
 def _find_next_unrated_index(sessions, rated_ids_set):
-    for i, s in enumerate(sessions):
-        sid = str(s.get("session_id", "")).strip()
+    # session_ids come from the dataset index (no session parsing)
+    for i, sid in enumerate(sessions.session_ids):
+        sid = str(sid).strip()
         if sid and sid not in rated_ids_set:
             return i
     return None
 
 
 def _ensure_resume_pointer(sessions, rater_id: str, culture: str):
-    rows = read_assess_rows()
-    rated_ids_set = rated_session_ids(rows, rater_id=rater_id, culture=culture)
+    rated_ids_set = rated_session_ids(rater_id=rater_id, culture=culture)
 
     # If session_idx not set or points to already-rated session, move to next unrated
     cur_idx = st.session_state.get("session_idx", None)
@@ -72,7 +65,7 @@ def _ensure_resume_pointer(sessions, rater_id: str, culture: str):
         cur_idx = 0
 
     cur_idx = max(0, min(cur_idx, len(sessions) - 1))
-    cur_sid = str(sessions[cur_idx].get("session_id", "")).strip()
+    cur_sid = str(sessions.session_ids[cur_idx]).strip()
     if cur_sid and cur_sid in rated_ids_set:
         nxt = _find_next_unrated_index(sessions, rated_ids_set)
         st.session_state["session_idx"] = nxt if nxt is not None else cur_idx
@@ -104,9 +97,8 @@ def main():
     # Resume logic (based on CSV)
     _ensure_resume_pointer(sessions, rater_id=rater_id, culture=culture)
 
-    # Progress UI
-    all_rows = read_assess_rows()
-    done, total = compute_progress(total, all_rows, rater_id=rater_id, culture=culture)
+    # Progress UI (indexed lookups, no full CSV scan)
+    done, total = compute_progress(total, rater_id=rater_id, culture=culture)
 
     st.markdown("## Conversation Assess")
     st.caption(f"Dataset: {culture} • Progress: {done}/{total} completed")
@@ -115,7 +107,7 @@ def main():
     ctrl = st.columns([1.2, 1.2, 3])
     with ctrl[0]:
         if st.button("Resume next unrated", use_container_width=True):
-            rated_ids_set = rated_session_ids(all_rows, rater_id=rater_id, culture=culture)
+            rated_ids_set = rated_session_ids(rater_id=rater_id, culture=culture)
             nxt = _find_next_unrated_index(sessions, rated_ids_set)
             if nxt is not None:
                 st.session_state["_scroll_top"] = True
@@ -141,16 +133,20 @@ def main():
     st.caption(f"Session ID: {sid}")
 
     # Chat (left/right bubbles)
-    render_chat(session.get("turns", []), culture=culture)
+    # long sessions: first CHAT_WINDOW_TURNS turns, more on demand (chunk bounds from the index)
+    render_chat(
+        session.get("turns", []),
+        culture=culture,
+        source=DATASET_FILES[culture],
+        session_id=sid,
+        window=CHAT_WINDOW_TURNS,
+        chunks=sessions.turn_chunks(idx, CHAT_WINDOW_TURNS),
+    )
 
     st.markdown("---")
 
     # If already rated, show info + last rating preview (latest row)
-    filtered = [
-        r for r in all_rows
-        if r.get("rater_id", "").strip() == rater_id and r.get("culture", "").strip() == culture
-    ]
-    latest_map = latest_rows_per_session(filtered)
+    latest_map = latest_rows_per_session(rater_id=rater_id, culture=culture)
     already = sid in latest_map
     if already:
         st.info("This session has been rated before (history is preserved). You can rate again; a new row will be appended.")
@@ -196,8 +192,7 @@ def main():
         append_assessment_row(row)
 
         # After saving, jump to next unrated session
-        all_rows = read_assess_rows()
-        rated_ids_set = rated_session_ids(all_rows, rater_id=rater_id, culture=culture)
+        rated_ids_set = rated_session_ids(rater_id=rater_id, culture=culture)
         nxt = _find_next_unrated_index(sessions, rated_ids_set)
 
         # request scroll-to-top on next render
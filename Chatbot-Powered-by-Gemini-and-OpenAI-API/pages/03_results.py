@@ -2,24 +2,78 @@ import streamlit as st
 
 from core_ui.layout import set_base_page_config, inject_base_css, render_top_right_signout
 from core_ui.auth import require_signed_in
-from core_ui.dataset import get_sessions_for_culture
+from core_ui.dataset import get_sessions_for_culture, DATASET_FILES
+from core.columnar import read_log_table
 from core.logs_assess import (
-    read_assess_rows,
-    filter_rows,
     rated_session_ids,
-    latest_rows_per_session,
     METRIC_FIELDS,
 )
+from core.results import (
+    KEY_COLUMNS,
+    ratings_frame,
+    ratings_matrix,
+    select,
+    latest_only,
+    metric_stats,
+    histograms,
+    summarize,
+    compare_latest_vs_all,
+)
+from core.agreement import agreement_summary, pairwise_kappa_table, MIN_PAIR_OVERLAP
 
 set_base_page_config()
 inject_base_css()
 
-
-def _safe_float(x):
-    try:
-        return float(x)
-    except Exception:
-        return None
+ALL = "(all)"
+
+LABELS = [
+    ("Empathy / Warmth", "empathy_warmth"),
+    ("Clarity / Helpfulness", "clarity_helpfulness"),
+    ("Safety / Non-judgment", "safety_nonjudgment"),
+    ("Cultural Appropriateness", "cultural_appropriateness"),
+    ("Specificity (not stereotypical)", "specificity_nostereotype"),
+    ("Maintains Original Meaning", "meaning_preserve"),
+]
+
+
+def _load_ratings(culture_filter):
+    # compacted Parquet + CSV tail, only the columns the engine needs; culture prunes partitions
+    filters = {} if culture_filter is None else {"culture": culture_filter}
+    df = read_log_table("assess_sessions", columns=[*KEY_COLUMNS, *METRIC_FIELDS, "comment"], filters=filters)
+    return ratings_frame(df)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _agreement(df, n_boot):
+    return agreement_summary(df, n_boot=n_boot)
+
+
+def render_agreement(df_all):
+    """Inter-rater agreement over all raters (latest rating per rater x session)."""
+    st.caption(
+        "Krippendorff's alpha (ordinal), ICC(1) and mean pairwise quadratic-weighted kappa, "
+        f"over sessions rated by 2+ raters. Kappa averages rater pairs sharing ≥ {MIN_PAIR_OVERLAP} sessions."
+    )
+    n_boot = st.select_slider("Bootstrap replicates (95% CI)", options=[0, 200, 500, 1000, 2000], value=0)
+    if df_all.empty:
+        st.info("No ratings yet.")
+        return
+
+    with st.spinner("Computing agreement…"):
+        table = _agreement(df_all, n_boot)
+    table = table.assign(metric=table["metric"].map({k: label for label, k in LABELS}))
+    st.dataframe(table.round(3), use_container_width=True, hide_index=True)
+    st.download_button(
+        "Download agreement (CSV)",
+        table.to_csv(index=False).encode("utf-8"),
+        file_name="agreement.csv",
+        mime="text/csv",
+    )
+
+    st.markdown("**Pairwise kappa**")
+    label = st.selectbox("Metric", [label for label, _ in LABELS], key="agree_metric")
+    pairs = pairwise_kappa_table(df_all, dict(LABELS)[label])
+    st.dataframe(pairs.round(3), use_container_width=True, hide_index=True)
 
 
 def main():
@@ -39,74 +93,101 @@ def main():
     sessions = get_sessions_for_culture(culture)
     total = len(sessions)
 
-    rows = read_assess_rows()
-    my_rows = filter_rows(rows, rater_id=rater_id, culture=culture)
-    done_ids = rated_session_ids(rows, rater_id=rater_id, culture=culture)
-    done = len(done_ids)
-
+    done = len(rated_session_ids(rater_id=rater_id, culture=culture))
     st.metric("Completed (unique sessions rated at least once)", f"{done} / {total}")
 
-    use_latest = st.checkbox("Use latest rating per session for summary stats", value=True)
-    if use_latest:
-        latest_map = latest_rows_per_session(my_rows)
-        summary_rows = list(latest_map.values())
-    else:
-        summary_rows = my_rows
-
-    # Compute means
-    means = {}
-    for m in METRIC_FIELDS:
-        vals = []
-        for r in summary_rows:
-            v = _safe_float(r.get(m, ""))
-            if v is not None:
-                vals.append(v)
-        means[m] = (sum(vals) / len(vals)) if vals else None
-
-    st.markdown("### Summary (means)")
-
-    labels = [
-        ("Empathy / Warmth", "empathy_warmth"),
-        ("Clarity / Helpfulness", "clarity_helpfulness"),
-        ("Safety / Non-judgment", "safety_nonjudgment"),
-        ("Cultural Appropriateness", "cultural_appropriateness"),
-        ("Specificity (not stereotypical)", "specificity_nostereotype"),
-        ("Maintains Original Meaning", "meaning_preserve"),
-    ]
-
-    # display in 3 columns (2 rows)
-    c1, c2, c3 = st.columns(3)
-    cols = [c1, c2, c3]
-
-    for i, (label, key) in enumerate(labels):
-        v = means.get(key)
-        display = "—" if v is None else f"{v:.2f}"
-    with cols[i % 3]:
-        st.metric(label, display)
-
-    st.caption("Means computed from your saved ratings. Toggle 'Use latest rating per session' to control history vs latest.")
-
-    st.markdown("---")
-    st.markdown("### Your saved rows")
-    st.caption("Policy: every submission is appended (history preserved).")
-
-    # Show compact table (newest first)
-    my_rows_sorted = sorted(my_rows, key=lambda r: r.get("timestamp_utc", ""), reverse=True)
-    
-    keep_cols = [
-        "timestamp_utc",
-        "session_id",
-        "empathy_warmth",
-        "clarity_helpfulness",
-        "safety_nonjudgment",
-        "cultural_appropriateness",
-        "specificity_nostereotype",
-        "meaning_preserve",
-        "comment",
-    ]
-
-    compact = [{k: row.get(k, "") for k in keep_cols} for row in my_rows_sorted]
-    st.dataframe(compact, use_container_width=True, hide_index=True)
+    # Scope: any rater / culture, or all of them
+    cultures = [c for c, p in DATASET_FILES.items() if p]
+    s1, s2 = st.columns(2)
+    with s1:
+        culture_sel = st.selectbox("Culture", [culture, *[c for c in cultures if c != culture], ALL])
+    df_all = _load_ratings(None if culture_sel == ALL else culture_sel)
+    raters = sorted(r for r in df_all["rater_id"].unique() if r and r != rater_id)
+    with s2:
+        rater_sel = st.selectbox("Rater", [rater_id, *raters, ALL])
+
+    tab_summary, tab_agree = st.tabs(["Summary", "Agreement"])
+
+    with tab_summary:
+        df = select(
+            df_all,
+            rater_id=None if rater_sel == ALL else rater_sel,
+            culture=None if culture_sel == ALL else culture_sel,
+        )
+
+        use_latest = st.checkbox("Use latest rating per session for summary stats", value=True)
+        summary_df = latest_only(df) if use_latest else df
+        stats = metric_stats(ratings_matrix(summary_df))
+
+        st.markdown("### Summary (means)")
+
+        # display in 3 columns (2 rows)
+        c1, c2, c3 = st.columns(3)
+        cols = [c1, c2, c3]
+
+        for i, (label, key) in enumerate(LABELS):
+            v = stats.loc[key, "mean"]
+            display = "—" if v != v else f"{v:.2f}"  # NaN check
+            with cols[i % 3]:
+                st.metric(label, display)
+
+        st.caption(
+            f"{len(summary_df)} rating(s) in scope. Toggle 'Use latest rating per session' to control history vs latest."
+        )
+
+        with st.expander("Details: std, 95% CI, histograms"):
+            table = stats.copy()
+            table.index = [label for label, _ in LABELS]
+            st.dataframe(table.round(3), use_container_width=True)
+
+            hist_metric = st.selectbox("Histogram metric", [label for label, _ in LABELS])
+            hist_key = dict(LABELS)[hist_metric]
+            st.bar_chart(histograms(ratings_matrix(summary_df))[hist_key])
+
+            st.markdown("**Latest vs all history**")
+            st.dataframe(compare_latest_vs_all(df).round(3), use_container_width=True)
+
+        by = [c for c, sel in (("rater_id", rater_sel), ("culture", culture_sel)) if sel == ALL]
+        if by:
+            st.markdown("### Breakdown")
+            breakdown = summarize(df, latest=use_latest, by=by)
+            if breakdown.empty:
+                st.info("No ratings in scope for a breakdown.")
+            else:
+                # pivot_table drops all-NaN metrics: reindex keeps every column in form order
+                st.dataframe(
+                    breakdown.pivot_table(index=by, columns="metric", values="mean")
+                    .reindex(columns=METRIC_FIELDS).round(2),
+                    use_container_width=True,
+                )
+        else:
+            breakdown = summarize(df, latest=use_latest)
+
+        st.download_button(
+            "Download summary (CSV)",
+            breakdown.to_csv(index=False).encode("utf-8"),
+            file_name="results_summary.csv",
+            mime="text/csv",
+        )
+
+        st.markdown("---")
+        st.markdown("### Saved rows")
+        st.caption("Policy: every submission is appended (history preserved).")
+
+        # Show compact table (newest first)
+        keep_cols = [
+            "timestamp_utc",
+            "rater_id",
+            "culture",
+            "session_id",
+            *METRIC_FIELDS,
+            "comment",
+        ]
+        compact = df.sort_values("timestamp_utc", ascending=False, kind="stable")[keep_cols]
+        st.dataframe(compact, use_container_width=True, hide_index=True)
+
+    with tab_agree:
+        render_agreement(df_all)
 
     st.markdown("---")
     nav = st.columns([1, 1, 2])
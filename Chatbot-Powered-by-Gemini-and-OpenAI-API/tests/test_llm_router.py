@@ -0,0 +1,49 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from core.llm_router import LatencyRouter, hedged
+
+
+class FastHedgeRouter(LatencyRouter):
+    def hedge_delay(self, model):
+        return 0.01
+
+
+def test_refused_hedge_model_is_still_tried_after_primary_failure():
+    primary_may_fail = threading.Event()
+    admits, spends = [], []
+
+    def admit(m, hedge):
+        admits.append((m, hedge))
+        if hedge:
+            primary_may_fail.set()
+            raise RuntimeError("no capacity for a hedge")
+
+    def attempt(m):
+        if m == "a":
+            primary_may_fail.wait(1)
+            raise RuntimeError("a down")
+        return f"ok {m}"
+
+    def may_retry():
+        spends.append(1)
+        return True
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        result = hedged(attempt, ["a", "b"], pool, router=FastHedgeRouter(),
+                        may_retry=may_retry, admit=admit)
+
+    assert result == ("ok b", "b")
+    assert ("b", True) in admits and admits[-1] == ("b", False)
+    assert len(spends) == 1  # the refused hedge spent no budget
+
+
+def test_primary_success_needs_no_fallback():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert hedged(lambda m: m, ["a", "b"], pool, router=FastHedgeRouter()) == ("a", "a")
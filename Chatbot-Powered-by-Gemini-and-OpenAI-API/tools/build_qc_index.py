@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from core_ui.dataset import DATASET_FILES
+from core_ui.dataset_qc import load_qc, qc_path
+
+
+def main(paths):
+    for path in paths:
+        data = load_qc(path)
+        print(f"{path.name}: {len(data['entries'])} sessions, {len(data['eligible'])} eligible -> {qc_path(path).name}")
+
+
+if __name__ == "__main__":
+    # Usage: python tools/build_qc_index.py [dataset.jsonl ...]   (default: all configured datasets)
+    paths = [Path(p) for p in sys.argv[1:]] or [p for p in DATASET_FILES.values() if p]
+    main(paths)
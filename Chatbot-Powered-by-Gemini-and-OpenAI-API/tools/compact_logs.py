@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from core.columnar import LOG_SOURCES, compact_all, MANIFEST
+
+
+def main(tables):
+    for res in compact_all(tables or LOG_SOURCES):
+        print(f"{res['table']}: compacted {res['rows']} rows into {res.get('files', 0)} file(s)")
+    print(f"manifest: {MANIFEST}")
+
+
+if __name__ == "__main__":
+    # Usage: python tools/compact_logs.py [turns sessions seff assess_sessions]
+    # Run from the app directory (core.logs writes to ./logs).
+    unknown = [t for t in sys.argv[1:] if t not in LOG_SOURCES]
+    if unknown:
+        print(f"Unknown table(s): {unknown}. Choose from {list(LOG_SOURCES)}")
+        raise SystemExit(1)
+    main(sys.argv[1:])
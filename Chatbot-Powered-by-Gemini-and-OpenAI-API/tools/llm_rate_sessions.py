@@ -0,0 +1,92 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from core_ui.dataset import DATASET_FILES, load_sessions_cached
+from core.llm_rater import rate_session
+from core.logs_assess import LLM_RATER_ID, append_assessment_row, rated_session_ids
+
+
+def iter_pending(culture, path, rater_id, limit=None):
+    """(idx, session) not yet rated by rater_id; sessions are parsed one at a time."""
+    sessions = load_sessions_cached(path)
+    done = rated_session_ids(rater_id=rater_id, culture=culture)  # the CSV rows are the checkpoint
+    n = 0
+    for idx, sid in enumerate(sessions.session_ids):
+        if str(sid).strip() in done:
+            continue
+        if limit is not None and n >= limit:
+            return
+        n += 1
+        yield idx, sessions[idx]
+
+
+def rate_one(gcall, culture, path, rater_id, idx, session):
+    scores = rate_session(gcall, session.get("turns", []), culture)
+    append_assessment_row({
+        "timestamp_utc": "",
+        "email": "",
+        "rater_id": rater_id,
+        "culture": culture,
+        "dataset_file": str(path),
+        "session_id": str(session.get("session_id", "")).strip(),
+        "session_idx": str(idx),
+        **scores,
+    })
+
+
+def main(cultures, rater_id=LLM_RATER_ID, concurrency=8, limit=None, gcall=None):
+    if gcall is None:
+        from core.llm import gcall as _gcall
+        gcall = partial(_gcall, priority="background")
+    stats = {"rated": 0, "failed": 0, "errors": []}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm-rater") as pool:
+        for culture in cultures:
+            path = DATASET_FILES[culture]
+            inflight = {}
+            for idx, session in iter_pending(culture, path, rater_id, limit):
+                # bounded window: keeps memory flat for large dataset files
+                while len(inflight) >= 2 * concurrency:
+                    finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        _collect(fut, inflight.pop(fut), stats)
+                fut = pool.submit(rate_one, gcall, culture, path, rater_id, idx, session)
+                inflight[fut] = (culture, session.get("session_id"))
+            for fut in list(inflight):
+                _collect(fut, inflight.pop(fut), stats)
+            print(f"{culture}: {stats['rated']} rated, {stats['failed']} failed so far", file=sys.stderr)
+    stats["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    stats["errors"] = stats["errors"][:20]
+    return stats
+
+
+def _collect(fut, key, stats):
+    try:
+        fut.result()
+        stats["rated"] += 1
+    except Exception as e:  # not written -> picked up again by the next run
+        stats["failed"] += 1
+        stats["errors"].append(f"{key[0]}/{key[1]}: {type(e).__name__}: {e}")
+
+
+if __name__ == "__main__":
+    configured = [c for c, p in DATASET_FILES.items() if p]
+    ap = argparse.ArgumentParser(description="LLM-as-rater baseline rows in assess_sessions.csv (resumable).")
+    ap.add_argument("cultures", nargs="*", default=configured, help=f"default: {configured}")
+    ap.add_argument("--rater-id", default=LLM_RATER_ID)
+    ap.add_argument("-c", "--concurrency", type=int, default=8)
+    ap.add_argument("--limit", type=int, default=None, help="max sessions per culture in this run")
+    args = ap.parse_args()
+    unknown = [c for c in args.cultures if c not in configured]
+    if unknown:
+        print(f"Unknown culture(s): {unknown}. Choose from {configured}")
+        raise SystemExit(1)
+    print(json.dumps(main(args.cultures, args.rater_id, args.concurrency, args.limit), indent=2))
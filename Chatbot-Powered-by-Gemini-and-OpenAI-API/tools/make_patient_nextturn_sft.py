@@ -1,75 +1,273 @@
+import argparse
 import json
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from core_ui.data import load_sessions_any, get_turns, qc_clean_turns
 
-OUT = Path("data/finetune/patient_nextturn.jsonl")
-OUT.parent.mkdir(parents=True, exist_ok=True)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
 
+from core.tokenizers import get_tokenizer
+from core_ui.dataset_index import iter_raw_sessions
+from core_ui.dataset_qc import qc_clean_turns
 
-def build_history(turns, up_to_idx, max_chars=1800):
-    # turns: cleaned list of {"role","text"}
-    # up_to_idx: include turns[0:up_to_idx] as context
-    chunks = []
-    for t in turns[:up_to_idx]:
-        if t["role"] == "user":
-            chunks.append(f"CLIENT: {t['text']}")
-        elif t["role"] == "assistant":
-            chunks.append(f"COUNSELOR: {t['text']}")
-    txt = "\n".join(chunks)
-    return txt[-max_chars:]  # keep tail
+OUT_DIR = Path("data/finetune/patient_nextturn")
+SHARD_SIZE = 50_000      # examples per output shard
+BATCH_SESSIONS = 256     # sessions handed to the pool at a time (bounds memory)
+MAX_CHARS = 1800         # history budget in "chars" mode
+MAX_TOKENS = 512         # history budget with a real tokenizer
+BUCKETS = [256, 512, 1024, 2048, 4096]  # upper bounds on input+output tokens per shard bucket
+HIST_BIN = 64            # token histogram bin width in stats.json
 
+SPEAKER = {"user": "CLIENT", "assistant": "COUNSELOR"}
 
-def main(ds_path: str):
-    sessions = load_sessions_any(ds_path)
-    n_written = 0
 
-    with OUT.open("w", encoding="utf-8") as w:
-        for sess in sessions:
-            raw_turns = get_turns(sess)
-            cleaned, qc = qc_clean_turns(raw_turns, remove_consecutive_dupes=True)
+class HistoryTail:
+    """
+    Rolling "CLIENT: ... / COUNSELOR: ..." context holding the last `budget` tokens of
+    "\n".join(all lines), without re-joining the whole history for every target turn.
+    Each line is tokenized once; with the "chars" tokenizer this is exactly
+    "\n".join(all lines)[-budget:].
+    """
 
-            # keep only user/assistant turns
-            ua = [t for t in cleaned if t["role"] in {"user","assistant"}]
-            if len(ua) < 4:
+    def __init__(self, budget: int = MAX_CHARS, tokenizer="chars"):
+        self.budget = budget
+        self.tok = get_tokenizer(tokenizer) if isinstance(tokenizer, str) else tokenizer
+        self.sep = self.tok.count("\n")
+        self.lines = deque()  # (line, n_tokens)
+        self.used = 0  # tokens of "\n".join(lines)
+
+    def append(self, line: str):
+        n = self.tok.count(line)
+        self.used += n + (self.sep if self.lines else 0)
+        self.lines.append((line, n))
+        # drop whole lines from the left while the rest still covers the budget
+        while len(self.lines) > 1 and self.used - self.lines[0][1] - self.sep >= self.budget:
+            self.used -= self.lines.popleft()[1] + self.sep
+
+    def text(self) -> str:
+        # whole lines from the right while they fit, then the tail of the next one
+        parts, left = [], self.budget
+        for line, n in reversed(self.lines):
+            cost = n + (self.sep if parts else 0)
+            if cost <= left:
+                parts.append(line)
+                left -= cost
                 continue
+            if parts:
+                left -= self.sep
+                if left < 0:
+                    break
+            parts.append(self.tok.tail(line, left))
+            break
+        return "\n".join(reversed(parts))
+
+
+def iter_sessions(path: Path):
+    """Raw session rows from a .jsonl (streamed) or a .json list."""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        yield from iter_raw_sessions(path)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    yield from (data if isinstance(data, list) else data.get("sessions", []))
+
+
+def session_examples(sess: dict, budget: int = MAX_CHARS, tokenizer: str = "chars") -> list:
+    """
+    (jsonl line, input tokens, output tokens) for one session;
+    target = CLIENT turn that follows a COUNSELOR turn.
+    """
+    cleaned, _ = qc_clean_turns(sess.get("turns", []), remove_consecutive_dupes=True)
+
+    # keep only user/assistant turns
+    ua = [t for t in cleaned if t["role"] in SPEAKER]
+    if len(ua) < 4:
+        return []
+
+    # you can optionally add profile/rewrite_target here if present
+    profile = sess.get("profile") or {}
+    rewrite_target = sess.get("rewrite_target") or ""
+    profile_json = json.dumps(profile, ensure_ascii=False)
+
+    tok = get_tokenizer(tokenizer)
+    with_counts = tokenizer != "chars"
+    out = []
+    tail = HistoryTail(budget, tok)
+    for i, t in enumerate(ua):
+        # pattern: ... COUNSELOR -> CLIENT(target); history includes counselor turn i-1
+        if i > 0 and t["role"] == "user" and ua[i - 1]["role"] == "assistant":
+            record = {
+                "profile": profile,
+                "rewrite_target": rewrite_target,
+                "input": (
+                    "You are simulating a counseling client.\n"
+                    f"Client profile: {profile_json}\n"
+                    f"Rewrite target: {rewrite_target}\n"
+                    "Conversation so far:\n"
+                    f"{tail.text()}\n\n"
+                    "Write the NEXT CLIENT message (1-3 sentences)."
+                ),
+                "output": t["text"],
+            }
+            n_in, n_out = tok.count(record["input"]), tok.count(record["output"])
+            if with_counts:
+                # lets downstream packing skip re-tokenizing
+                record["n_input_tokens"], record["n_output_tokens"] = n_in, n_out
+            out.append((json.dumps(record, ensure_ascii=False), n_in, n_out))
+        tail.append(f"{SPEAKER[t['role']]}: {t['text']}")
+    return out
+
+
+def bucket_name(n_tokens: int, buckets=BUCKETS) -> str:
+    for ub in buckets:
+        if n_tokens <= ub:
+            return f"le{ub:05d}"
+    return f"gt{buckets[-1]:05d}"
+
+
+class LengthStats:
+    """Per-bucket counts + fixed-width token histograms, written to stats.json."""
+
+    def __init__(self, bin_width: int = HIST_BIN):
+        self.bin_width = bin_width
+        self.buckets = {}
+        self.hist = {"input": Counter(), "output": Counter(), "total": Counter()}
+        self.max = {"input": 0, "output": 0, "total": 0}
+
+    def add(self, bucket: str, n_in: int, n_out: int):
+        b = self.buckets.setdefault(bucket, {"examples": 0, "tokens": 0})
+        b["examples"] += 1
+        b["tokens"] += n_in + n_out
+        for key, n in (("input", n_in), ("output", n_out), ("total", n_in + n_out)):
+            self.hist[key][n // self.bin_width * self.bin_width] += 1
+            self.max[key] = max(self.max[key], n)
+
+    def to_dict(self) -> dict:
+        return {
+            "bin_width": self.bin_width,
+            "buckets": dict(sorted(self.buckets.items())),
+            "max_tokens": self.max,
+            "histograms": {k: {str(b): c for b, c in sorted(h.items())} for k, h in self.hist.items()},
+        }
+
+
+class ShardWriter:
+    """part-00000.jsonl, part-00001.jsonl, ... with at most shard_size lines each."""
+
+    def __init__(self, out_dir: Path, shard_size: int = SHARD_SIZE):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.shards = []
+        self.n_written = 0
+        self._f = None
+        self._in_shard = 0
+
+    def write(self, lines):
+        for line in lines:
+            if self._f is None or self._in_shard >= self.shard_size:
+                self._rotate()
+            self._f.write(line + "\n")
+            self._in_shard += 1
+            self.n_written += 1
+
+    def _rotate(self):
+        if self._f is not None:
+            self._f.close()
+        path = self.out_dir / f"part-{len(self.shards):05d}.jsonl"
+        self.shards.append(path)
+        self._f = path.open("w", encoding="utf-8")
+        self._in_shard = 0
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def _batches(it, n):
+    it = iter(it)
+    while True:
+        batch = list(islice(it, n))
+        if not batch:
+            return
+        yield batch
+
+
+def main(ds_paths, out_dir=OUT_DIR, shard_size=SHARD_SIZE, workers=None,
+         tokenizer="chars", budget=MAX_CHARS, buckets=BUCKETS):
+    """
+    Shards go to <out_dir>/bucket-le00512/part-00000.jsonl, ... by input+output tokens,
+    plus <out_dir>/stats.json (tokenizer, per-bucket counts, token histograms).
+    """
+    out_dir = Path(out_dir)
+    workers = workers or os.cpu_count() or 1
+    get_tokenizer(tokenizer)  # fail fast on a bad spec / missing optional dependency
+    # only the layout ShardWriter writes here: <out_dir>/bucket-*/part-NNNNN.jsonl
+    for old in out_dir.glob("bucket-*/part-[0-9][0-9][0-9][0-9][0-9].jsonl"):
+        old.unlink()
+
+    fn = partial(session_examples, budget=budget, tokenizer=tokenizer)
+    writers = {}
+    stats = LengthStats()
+    n_sessions = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for path in ds_paths:
+            for batch in _batches(iter_sessions(path), BATCH_SESSIONS):
+                # map() yields in input order -> output is identical for any worker count
+                results = pool.map(fn, batch, chunksize=16) if pool else map(fn, batch)
+                for examples in results:
+                    for line, n_in, n_out in examples:
+                        bucket = bucket_name(n_in + n_out, buckets)
+                        if bucket not in writers:
+                            writers[bucket] = ShardWriter(out_dir / f"bucket-{bucket}", shard_size)
+                        writers[bucket].write([line])
+                        stats.add(bucket, n_in, n_out)
+                n_sessions += len(batch)
+    finally:
+        for w in writers.values():
+            w.close()
+        if pool is not None:
+            pool.shutdown()
+
+    manifest = {
+        "tokenizer": tokenizer,
+        "history_budget": budget,
+        "bucket_bounds": list(buckets),
+        "sessions": n_sessions,
+        "examples": sum(w.n_written for w in writers.values()),
+        **stats.to_dict(),
+    }
+    for name, w in writers.items():
+        manifest["buckets"][name]["shards"] = [str(p.relative_to(out_dir)) for p in w.shards]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "stats.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
 
-            # make examples where target = next CLIENT turn
-            # pattern: ... COUNSELOR -> CLIENT(target)
-            for i in range(1, len(ua)):
-                if ua[i]["role"] != "user":
-                    continue
-                if ua[i-1]["role"] != "assistant":
-                    continue
-
-                history = build_history(ua, up_to_idx=i)  # includes counselor turn i-1
-                target = ua[i]["text"]
-
-                # you can optionally add profile/rewrite_target here if present
-                profile = sess.get("profile") or {}
-                rewrite_target = sess.get("rewrite_target") or ""
-
-                record = {
-                    "profile": profile,
-                    "rewrite_target": rewrite_target,
-                    "input": (
-                        "You are simulating a counseling client.\n"
-                        f"Client profile: {json.dumps(profile, ensure_ascii=False)}\n"
-                        f"Rewrite target: {rewrite_target}\n"
-                        "Conversation so far:\n"
-                        f"{history}\n\n"
-                        "Write the NEXT CLIENT message (1-3 sentences)."
-                    ),
-                    "output": target
-                }
-                w.write(json.dumps(record, ensure_ascii=False) + "\n")
-                n_written += 1
-
-    print(f"wrote {n_written} examples to {OUT}")
+    print(f"wrote {manifest['examples']} examples from {n_sessions} sessions into {len(writers)} bucket(s) in {out_dir}")
+    for name, b in manifest["buckets"].items():
+        print(f"  {name}: {b['examples']} examples, {len(b['shards'])} shard(s)")
 
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python tools/make_patient_nextturn_sft.py <path_to_json_or_jsonl>")
-        raise SystemExit(1)
-    main(sys.argv[1])
+    ap = argparse.ArgumentParser(description="Next-CLIENT-turn SFT examples from PsyDial-style sessions.")
+    ap.add_argument("ds_paths", nargs="+", type=Path, help="dataset .jsonl (or .json) file(s)")
+    ap.add_argument("--out-dir", type=Path, default=OUT_DIR)
+    ap.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    ap.add_argument("--workers", type=int, default=None, help="default: all CPUs; 1 = no process pool")
+    ap.add_argument("--tokenizer", default="chars",
+                    help="chars | whitespace | bytes | hf:<name> | tiktoken:<encoding> (see core/tokenizers.py)")
+    ap.add_argument("--max-chars", type=int, default=MAX_CHARS, help="history budget in chars mode")
+    ap.add_argument("--max-tokens", type=int, default=MAX_TOKENS, help="history budget with a tokenizer")
+    ap.add_argument("--buckets", default=",".join(map(str, BUCKETS)),
+                    help="comma-separated upper bounds on input+output tokens")
+    args = ap.parse_args()
+    budget = args.max_chars if args.tokenizer == "chars" else args.max_tokens
+    buckets = sorted(int(b) for b in args.buckets.split(",") if b.strip())
+    main(args.ds_paths, args.out_dir, args.shard_size, args.workers, args.tokenizer, budget, buckets)
@@ -0,0 +1,62 @@
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from core.metrics import DEFAULT_KEYS, FEEDBACK_FIELDS
+from core.simulate import COUNSELOR_STYLES, PRACTICE_MODES, SimConfig, run_simulation
+
+
+class OfflineLLM:
+    """
+    gcall-compatible stand-in for load-testing the pipeline without API quota:
+    sleeps `latency_s` per call and answers supervisor/label prompts with valid JSON.
+    """
+
+    def __init__(self, latency_s: float = 0.0, seed: int = 0):
+        self.latency_s = latency_s
+        self.seed = seed
+
+    def __call__(self, prompt, models=None, max_tokens=450, temperature=0.6, cache=None):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        # stable digest: str hash() is salted per process and would break --seed reproducibility
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+        flags = {k: rng.randint(0, 1) for k in DEFAULT_KEYS}
+        if '"labels"' in prompt:
+            fb = {k: "Keep going." for k in FEEDBACK_FIELDS}
+            return json.dumps({"labels": flags, "feedback": fb}), "offline"
+        if prompt.rstrip().endswith("JSON:"):
+            return json.dumps(flags), "offline"
+        return "I hear you. What feels hardest about it right now?", "offline"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run simulated CARE sessions headlessly.")
+    ap.add_argument("-n", "--sessions", type=int, default=10, help="simulated counselors (each runs Pre/Practice/Post)")
+    ap.add_argument("-c", "--concurrency", type=int, default=8)
+    ap.add_argument("--styles", default=",".join(COUNSELOR_STYLES), help=f"subset of {list(COUNSELOR_STYLES)}")
+    ap.add_argument("--practice-mode", default="mixed", choices=["mixed", *PRACTICE_MODES])
+    ap.add_argument("--log-dir", default="logs/sim")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--offline", type=float, default=None, metavar="LATENCY_S",
+                    help="no API calls: canned replies after LATENCY_S seconds (pipeline load test)")
+    args = ap.parse_args()
+
+    cfg = SimConfig(
+        n_sessions=args.sessions,
+        concurrency=args.concurrency,
+        styles=tuple(s for s in args.styles.split(",") if s in COUNSELOR_STYLES),
+        practice_mode=args.practice_mode,
+        log_dir=args.log_dir,
+        seed=args.seed,
+    )
+    llm = OfflineLLM(args.offline, args.seed) if args.offline is not None else None
+    print(json.dumps(run_simulation(cfg, llm), indent=2))